@@ -0,0 +1,114 @@
+"""Benchmark the Huber driver's request path against simulated baths.
+
+Runs entirely in-process using `huber.simulator`, so no hardware is needed.
+Results are printed and written as JSON for comparison between revisions:
+
+    python benchmarks/bench_driver.py --output bench_results.json
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import platform
+import statistics
+import time
+
+from huber import Bath, BathFleet
+from huber.simulator import Farm, Server
+
+
+def summarize(samples):
+    """Reduce a list of latencies (s) to summary statistics (ms)."""
+    samples = sorted(samples)
+
+    def percentile(p):
+        return 1000 * samples[min(len(samples) - 1, int(p * len(samples)))]
+    return {
+        'n': len(samples),
+        'mean_ms': 1000 * statistics.fmean(samples),
+        'p50_ms': percentile(0.50),
+        'p95_ms': percentile(0.95),
+        'p99_ms': percentile(0.99),
+    }
+
+
+async def time_calls(function, iterations):
+    """Time repeated awaits of a zero-argument coroutine function."""
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        await function()
+        samples.append(time.perf_counter() - start)
+    return summarize(samples)
+
+
+async def bench_single(iterations, rtt):
+    """Measure single-field, snapshot and write latency on one bath."""
+    results = {}
+    async with Server(port=0, latency=rtt) as server:
+        async with Bath('127.0.0.1', port=server.port) as bath:
+            results['get_field'] = await time_calls(bath.get_bath_temperature, iterations)
+            results['get_snapshot'] = await time_calls(bath.get, iterations)
+            results['set_field'] = await time_calls(lambda: bath.set_setpoint(25.0),
+                                                    iterations)
+        async with Bath('127.0.0.1', port=server.port, pipeline=True) as bath:
+            results['get_snapshot_pipelined'] = await time_calls(bath.get, iterations)
+    return results
+
+
+async def bench_fleet(baths, rtt, cycles, pipeline):
+    """Measure total fleet throughput, in samples (fields) per second."""
+    async with Farm(baths, latency=rtt) as farm:
+        fleet = BathFleet(farm.addresses, pipeline=pipeline)
+        await fleet.get()  # connect
+        start = time.perf_counter()
+        for _ in range(cycles):
+            await fleet.get()
+        elapsed = time.perf_counter() - start
+        fleet.close()
+    samples = baths * cycles * len(Bath.defaults)
+    return {'baths': baths, 'rtt_ms': 1000 * rtt, 'pipeline': pipeline,
+            'cycle_ms': 1000 * elapsed / cycles, 'samples_per_s': samples / elapsed}
+
+
+async def run(args):
+    """Run all benchmarks and collect the results."""
+    results = {
+        'python': platform.python_version(),
+        'timestamp': time.time(),
+        'single': {f'{1000 * rtt:g}ms': await bench_single(args.iterations, rtt)
+                   for rtt in args.rtt},
+        'fleet': [],
+    }
+    for baths in args.baths:
+        for rtt in args.rtt:
+            for pipeline in (False, True):
+                results['fleet'].append(await bench_fleet(baths, rtt, args.cycles, pipeline))
+    return results
+
+
+def command_line(args=None):
+    """Parse arguments, run the benchmarks and write the results."""
+    parser = argparse.ArgumentParser(description="Benchmark the Huber driver.")
+    parser.add_argument('--iterations', default=200, type=int,
+                        help="Requests per single-bath latency benchmark.")
+    parser.add_argument('--cycles', default=5, type=int,
+                        help="Poll cycles per fleet throughput benchmark.")
+    parser.add_argument('--baths', default=[1, 10, 100], type=int, nargs='+',
+                        help="Fleet sizes to benchmark.")
+    parser.add_argument('--rtt', default=[0.0, 0.001, 0.005], type=float, nargs='+',
+                        help="Injected round-trip times, in seconds, applied "
+                        "from each command's arrival to its reply.")
+    parser.add_argument('--output', '-o', default=None,
+                        help="Write JSON results to this path.")
+    args = parser.parse_args(args)
+    results = asyncio.run(run(args))
+    print(json.dumps(results, indent=4))
+    if args.output:
+        with open(args.output, 'w') as out_file:
+            json.dump(results, out_file, indent=4)
+
+
+if __name__ == '__main__':
+    command_line()
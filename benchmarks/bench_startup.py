@@ -0,0 +1,57 @@
+"""Benchmark the cost of importing huber, as paid by every CLI call.
+
+Each sample is a fresh interpreter, so nothing is cached between runs:
+
+    python benchmarks/bench_startup.py --output startup.json
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+
+BASELINE = 'import asyncio, json, argparse'
+PROBE = ('import sys, huber, huber.util as u; '
+         'print(u._faults is None, "csv" in sys.modules)')
+
+
+def time_import(statement, runs):
+    """Return the median wall time, in ms, of running `statement` in a new interpreter."""
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, '-c', statement], check=True)
+        samples.append(1000 * (time.perf_counter() - start))
+    return statistics.median(samples)
+
+
+def command_line(args=None):
+    """Parse arguments, run the benchmark and write the results."""
+    parser = argparse.ArgumentParser(description="Benchmark importing huber.")
+    parser.add_argument('--runs', default=20, type=int, help="Interpreters to start.")
+    parser.add_argument('--output', '-o', default=None,
+                        help="Write JSON results to this path.")
+    args = parser.parse_args(args)
+    lazy = subprocess.run([sys.executable, '-c', PROBE], check=True,
+                          capture_output=True, text=True).stdout.split()
+    baseline = time_import(BASELINE, args.runs)
+    total = time_import('import huber', args.runs)
+    results = {
+        'python': sys.version.split()[0],
+        'baseline_ms': baseline,
+        'import_huber_ms': total,
+        'huber_overhead_ms': total - baseline,
+        'faults_loaded_on_import': lazy[0] != 'True',
+        'csv_imported': lazy[1] == 'True',
+    }
+    print(json.dumps(results, indent=4))
+    if args.output:
+        with open(args.output, 'w') as out_file:
+            json.dump(results, out_file, indent=4)
+
+
+if __name__ == '__main__':
+    command_line()
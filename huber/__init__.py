@@ -1,6 +1,12 @@
 """Import shorthand and command-line tool for Huber baths."""
 
-from huber.driver import Bath
+from huber.codec import UnsupportedFieldError
+from huber.driver import Bath, BathUnavailableError
+from huber.fleet import BathFleet
+from huber.sync import SyncBath, SyncFleet
+
+__all__ = ['Bath', 'BathFleet', 'BathUnavailableError', 'SyncBath', 'SyncFleet',
+           'UnsupportedFieldError', 'command_line']
 
 
 def command_line(args=None):
@@ -0,0 +1,206 @@
+"""Event-driven alarms on top of status polling.
+
+`Bath.get()` re-reads the error and warning registers on every call while
+their status bits are set. `AlarmEngine` instead remembers the previous
+status, reads fault details only when a bit rises, and re-evaluates each
+threshold rule only when one of its inputs changes. Alarms are raised and
+cleared as events, passed to callbacks and async subscribers without
+blocking the poll loop.
+
+Distributed under the GNU General Public License v2
+Copyright (C) 2017 NuMat Technologies
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from typing import Any, NamedTuple
+
+from huber import util
+
+logger = logging.getLogger('huber')
+
+FAULTS = ('error', 'warning')
+
+
+class Alarm(NamedTuple):
+    """An alarm being raised (`active`) or cleared."""
+
+    name: str
+    active: bool
+    time: float
+    detail: Any = None
+
+
+class Threshold:
+    """Alarm while a field is below `low` or above `high`.
+
+    An active alarm clears once the value is back inside the limits by at
+    least `hysteresis`, so noisy readings don't make it flap.
+    """
+
+    def __init__(self, name, key, low=None, high=None, hysteresis=0.0):
+        """Configure the rule. Either limit may be omitted."""
+        self.name = name
+        self.keys: tuple[str, ...] = (key,)
+        self.low = low
+        self.high = high
+        self.hysteresis = hysteresis
+
+    def check(self, values, active):
+        """Return True if the alarm should be active for these values."""
+        value = values[self.keys[0]]
+        margin = self.hysteresis if active else 0.0
+        return ((self.low is not None and value < self.low + margin) or
+                (self.high is not None and value > self.high - margin))
+
+
+class Deviation(Threshold):
+    """Alarm while a field strays more than `limit` from a reference field."""
+
+    def __init__(self, name, key='temperature.bath', reference='temperature.setpoint',
+                 limit=1.0, hysteresis=0.0):
+        """Configure the rule. Defaults compare bath temperature to setpoint."""
+        super().__init__(name, key, -limit, limit, hysteresis)
+        self.keys = (key, reference)
+
+    def check(self, values, active):
+        """Return True if the alarm should be active for these values."""
+        key, reference = self.keys
+        return super().check({key: values[key] - values[reference]}, active)
+
+
+class AlarmEngine:
+    """Watch a bath's status and threshold rules, dispatching alarm events.
+
+        engine = AlarmEngine(bath, [Threshold('fill low', 'fill', low=0.2),
+                                    Deviation('off target', limit=2.0),
+                                    Threshold('maintenance due', 'maintenance', low=7)])
+        engine.on(print)
+        await engine.run()
+
+    Error and warning alarms are named 'error' and 'warning', with the fault
+    dictionary from `faults.csv` as their detail.
+    """
+
+    def __init__(self, bath, rules=(), interval=1.0):
+        """Set up the engine. Call `run` to start polling."""
+        self.bath = bath
+        self.rules = list(rules)
+        self.interval = interval
+        self.active: dict[str, Alarm] = {}
+        self.values: dict[str, Any] = {}
+        self.callbacks: list = []
+        self.subscribers: set[asyncio.Queue] = set()
+        self._tasks: set[asyncio.Future] = set()
+
+    @property
+    def keys(self):
+        """Return the fields polled each cycle."""
+        keys = {'status'}
+        for rule in self.rules:
+            keys.update(rule.keys)
+        return sorted(keys)
+
+    def on(self, callback):
+        """Call `callback(alarm)` on every event. Coroutine functions run as tasks."""
+        self.callbacks.append(callback)
+        return callback
+
+    async def events(self, queue_size=64):
+        """Yield alarm events as they happen. Lagging consumers lose the oldest."""
+        queue: asyncio.Queue = asyncio.Queue(queue_size)
+        self.subscribers.add(queue)
+        try:
+            while True:
+                yield await queue.get()
+        finally:
+            self.subscribers.discard(queue)
+
+    async def run(self):
+        """Poll the bath every `interval` seconds and evaluate alarms, forever.
+
+        Failed polls, including replies that can't be decoded, raise a
+        'communication' alarm with the exception as its detail, which clears
+        on the next successful poll.
+        """
+        loop = asyncio.get_running_loop()
+        start, tick = loop.time(), 0
+        while True:
+            timestamp = time.time()
+            try:
+                values = await self.bath.get(self.keys, flat=True)
+            except (OSError, asyncio.TimeoutError, ValueError, KeyError) as e:
+                if 'communication' not in self.active:
+                    logger.warning(f'Polling alarms failed: {e!r}')
+                self._set('communication', True, timestamp, e)
+            else:
+                self._set('communication', False, timestamp)
+                await self.update(values, timestamp)
+            tick = util.next_tick(tick, start, self.interval, loop.time())
+            await asyncio.sleep(start + tick * self.interval - loop.time())
+
+    async def update(self, values, timestamp):
+        """Evaluate one poll's flat values, dispatching any alarm changes.
+
+        Values that weren't read (None) are ignored, so rules keep their
+        state through timeouts.
+        """
+        values = {key: value for key, value in values.items() if value is not None}
+        changed = {key for key, value in values.items() if self.values.get(key) != value}
+        previous = self.values.get('status')
+        self.values.update(values)
+        status = values.get('status')
+        if status is not None:
+            for name in FAULTS:
+                if status[name] and not (previous and previous[name]):
+                    try:
+                        detail = await getattr(self.bath, f'get_{name}')()
+                    except (OSError, KeyError):
+                        detail = None  # unreadable, or missing from faults.csv
+                    self._set(name, True, timestamp, detail)
+                elif not status[name]:
+                    self._set(name, False, timestamp)
+        for rule in self.rules:
+            if changed.intersection(rule.keys) and all(k in self.values for k in rule.keys):
+                active = rule.name in self.active
+                self._set(rule.name, bool(rule.check(self.values, active)), timestamp)
+
+    def _set(self, name, active, timestamp, detail=None):
+        """Record an alarm's state, dispatching an event if it changed."""
+        if active == (name in self.active):
+            return
+        alarm = Alarm(name, active, timestamp, detail)
+        if active:
+            self.active[name] = alarm
+        else:
+            del self.active[name]
+        self._dispatch(alarm)
+
+    def _dispatch(self, alarm):
+        """Hand an event to callbacks and subscribers without waiting on them."""
+        loop = asyncio.get_running_loop()
+        for callback in self.callbacks:
+            if asyncio.iscoroutinefunction(callback):
+                task = asyncio.ensure_future(callback(alarm))
+                self._tasks.add(task)
+                task.add_done_callback(self._finished)
+            else:
+                loop.call_soon(self._call, callback, alarm)
+        for queue in self.subscribers:
+            util.offer(queue, alarm)
+
+    def _finished(self, task):
+        """Log a failed async callback."""
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f'Alarm callback failed: {task.exception()!r}')
+
+    @staticmethod
+    def _call(callback, alarm):
+        """Run a callback, logging instead of raising on failure."""
+        try:
+            callback(alarm)
+        except Exception as e:
+            logger.error(f'Alarm callback failed: {e!r}')
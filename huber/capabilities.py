@@ -0,0 +1,34 @@
+"""Persistence of which fields each bath model supports.
+
+Distributed under the GNU General Public License v2
+Copyright (C) 2017 NuMat Technologies
+"""
+from __future__ import annotations
+
+import json
+import os
+
+
+def load(path, device):
+    """Return the saved capabilities of a device, as {key: supported}."""
+    try:
+        with open(path, encoding='utf8') as in_file:
+            return dict(json.load(in_file).get(device, {}))
+    except (OSError, ValueError):
+        return {}
+
+
+def save(path, device, capabilities):
+    """Merge a device's capabilities into the file, replacing it atomically."""
+    import tempfile
+    try:
+        with open(path, encoding='utf8') as in_file:
+            saved = json.load(in_file)
+    except (OSError, ValueError):
+        saved = {}
+    saved[device] = capabilities
+    directory = os.path.dirname(os.path.abspath(path))
+    with tempfile.NamedTemporaryFile('w', dir=directory, suffix='.tmp', delete=False,
+                                     encoding='utf8') as out_file:
+        json.dump(saved, out_file, indent=4, sort_keys=True)
+    os.replace(out_file.name, path)
@@ -0,0 +1,141 @@
+"""Precompiled command and reply codec for Huber's PB protocol.
+
+Everything that can be derived from `util.fields` ahead of time (command
+bytes, reply prefixes, decoders) is built once at import, so the request
+path only slices and converts the four hex digits of each reply.
+"""
+from __future__ import annotations
+
+from typing import Any, Callable, NamedTuple
+
+from huber import util
+
+NOT_IMPLEMENTED = 0x7FFF
+
+
+class UnsupportedFieldError(OSError):
+    """Raised when a bath replies 7FFF, as its model lacks the field."""
+
+
+class Field(NamedTuple):
+    """Compiled description of a single bath field."""
+
+    key: str
+    address: int
+    format: str
+    writable: bool
+    range: tuple | None
+    command: bytes
+    prefix: bytes
+    decoder: Callable[[int], Any]
+
+    def decode(self, number):
+        """Decode a reply integer, raising if it is outside the allowed range."""
+        if number is None:
+            return None
+        value = self.decoder(number)
+        if self.range is not None and not self.range[0] <= value <= self.range[1]:
+            raise ValueError(f'Value {value} outside allowed range.')
+        return value
+
+    def to_column(self, number):
+        """Convert a reply integer to the value kept in typed column arrays.
+
+        Numbers are decoded without a range check, the status becomes an
+        unsigned bitfield, and fault codes are kept as they are.
+        """
+        if self.format == 'list':
+            return number & 0xFFFF  # replies are signed; the bitfield is not
+        if self.format == 'fault':
+            return number
+        return self.decoder(number)
+
+    def encode(self, value):
+        """Build the command bytes that write `value` to this field."""
+        number = int(100 * value if self.format == 'f' else value)
+        return b'{M%02X%s\r\n' % (self.address, util.int_to_hex(number).encode())
+
+
+def _decoder(settings):
+    """Return a function mapping a reply integer to its python value."""
+    format = settings['format']
+    if format == 'b':
+        return bool
+    if format == 'd':
+        return int
+    if format == 'f':
+        return lambda number: number / 100.0
+    if format == '%':
+        return lambda number: number / 1000.0
+    if format == 'list':
+        bits = tuple(settings['list'].items())
+        return lambda number: {v: bool(number >> i & 1) for i, v in bits}
+    if format == 'fault':
+        return lambda number: util.get_faults()[number] if number < 0 else None
+    raise NotImplementedError(f'Number format "{format}" not supported.')
+
+
+def _compile(tree, path=''):
+    """Walk `util.fields`, yielding a `Field` for every leaf."""
+    for name, settings in tree.items():
+        key = f'{path}{name}'
+        if 'address' not in settings:
+            yield from _compile(settings, f'{key}.')
+            continue
+        address = settings['address']
+        yield Field(
+            key=key,
+            address=address,
+            format=settings['format'],
+            writable=settings.get('writable', False),
+            range=settings.get('range'),
+            command=b'{M%02X****\r\n' % address,
+            prefix=b'{S%02X' % address,
+            decoder=_decoder(settings),
+        )
+
+
+fields = {field.key: field for field in _compile(util.fields)}
+by_address = {field.address: field for field in fields.values()}
+
+
+def hex_to_int(digits):
+    """Convert four hex digits (bytes or str) to a signed 16-bit integer.
+
+    As in `util.hex_to_int`, '7FFF' means the command is not implemented.
+    """
+    return to_signed(int(digits, 16))
+
+
+def to_signed(number):
+    """Convert an unsigned 16-bit reply value to a signed integer."""
+    if number == NOT_IMPLEMENTED:
+        raise UnsupportedFieldError("Command not enabled on this Huber model.")
+    return number - 0x10000 if number & 0x8000 else number
+
+
+def parse_reply(line, prefix):
+    """Extract the integer from a raw `{S` reply line, or None if malformed.
+
+    `line` is the bytes read off the wire, including the trailing CRLF.
+    """
+    if line is None:
+        return None
+    if len(line) != 10:
+        line = line.strip()
+        if len(line) != 8:
+            return None
+    if line[:4] != prefix:
+        return None
+    return hex_to_int(line[4:8])
+
+
+def reply_address(line):
+    """Return the address echoed by a `{S` reply line, or None if malformed."""
+    line = line.strip()
+    if len(line) != 8 or line[:2] != b'{S':
+        return None
+    try:
+        return int(line[2:4], 16)
+    except ValueError:
+        return None
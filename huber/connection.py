@@ -0,0 +1,93 @@
+"""Process-wide sharing of bath connections.
+
+Distributed under the GNU General Public License v2
+Copyright (C) 2017 NuMat Technologies
+"""
+from __future__ import annotations
+
+from typing import Any
+
+from huber.scheduler import Scheduler
+
+
+class RttEstimator:
+    """Smoothed round-trip time and retransmission timeout, as in RFC 6298."""
+
+    granularity = 0.001
+
+    def __init__(self):
+        self.srtt: float | None = None
+        self.rttvar = 0.0
+        self.backoff = 1
+
+    @property
+    def rto(self):
+        """Return the timeout implied by the samples, or None if there are none."""
+        if self.srtt is None:
+            return None
+        return (self.srtt + max(self.granularity, 4 * self.rttvar)) * self.backoff
+
+    def sample(self, rtt):
+        """Update the estimate with a measured round trip, in seconds."""
+        if self.srtt is None:
+            self.srtt, self.rttvar = rtt, rtt / 2
+        else:
+            self.rttvar = 0.75 * self.rttvar + 0.25 * abs(self.srtt - rtt)
+            self.srtt = 0.875 * self.srtt + 0.125 * rtt
+        self.backoff = 1
+
+    def timed_out(self):
+        """Double the timeout until the next successful sample."""
+        self.backoff = min(self.backoff * 2, 64)
+
+
+class Link:
+    """TCP connection, request queue and reconnect state for one bath.
+
+    A `Bath` owns a private link unless created with `shared=True`, in which
+    case every such `Bath` for the same (ip, port) uses the same link from
+    the registry, so the controller serves one session and one queue.
+    """
+
+    def __init__(self, key=None):
+        self.key = key
+        self.users = 0
+        self.connection: Any = None  # a transport from `huber.transport`
+        self.open = False
+        self.scheduler = Scheduler()
+        self.rtt = RttEstimator()
+        self.reconnecting = False
+        self.failures = 0
+        self.retry_at = 0.0
+
+    def lost(self, transport):
+        """Mark the link closed, unless a reconnect already replaced `transport`."""
+        if self.connection is transport:
+            self.open = False
+
+    def disconnect(self):
+        """Close the TCP connection. It is reopened on the next request."""
+        if self.open and self.connection is not None:
+            self.connection.close()
+        self.open = False
+
+
+links: dict[tuple[str, int], Link] = {}
+
+
+def acquire(ip, port):
+    """Return the shared link for a bath, registering one more user."""
+    link = links.get((ip, port))
+    if link is None:
+        link = links[(ip, port)] = Link((ip, port))
+    link.users += 1
+    return link
+
+
+def release(link):
+    """Unregister a user, closing the connection when the last one leaves."""
+    link.users -= 1
+    if link.users <= 0:
+        link.disconnect()
+        if links.get(link.key) is link:
+            del links[link.key]
@@ -7,13 +7,24 @@ from __future__ import annotations
 
 import asyncio
 import logging
+import time
+from fnmatch import fnmatchcase
+from functools import lru_cache
 from typing import Any, ClassVar
 
-from huber import util
+from huber import capabilities, codec, connection, util
+from huber.metrics import Metrics
+from huber.scheduler import ALARM, ALARM_FIELDS, CONTROL, TELEMETRY
+from huber.snapshot import Snapshot, Status
+from huber.transport import TRANSPORTS
 
 logger = logging.getLogger('huber')
 
 
+class BathUnavailableError(OSError):
+    """Raised without touching the network while a bath's reconnect is backed off."""
+
+
 class Bath:
     """Python driver for Huber recirculating baths."""
 
@@ -30,23 +41,59 @@ class Bath:
         'status'
     ]
 
-    def __init__(self, ip, max_timeouts=10, comm_timeout=0.5):
-        """Initialize the connection with the bath's IP address."""
+    def __init__(self, ip, max_timeouts=10, comm_timeout=0.5, pipeline=False,
+                 port=None, cache_ttl=None, backoff=1.0, max_backoff=60.0, trace=None,
+                 recorder=None, queue_deadline=None, shared=False, adaptive_timeout=False,
+                 timeout_bounds=(0.01, 5.0), capabilities_file=None, transport='stream'):
+        """Initialize the connection with the bath's IP address.
+
+        Options, each described in the README:
+            pipeline: send the commands of multi-field reads back to back
+            cache_ttl: seconds to cache reads, or a dictionary by key
+            backoff, max_backoff: reconnect delays after failures, in seconds
+            trace, recorder: a callback per request, and a reading history
+            queue_deadline: seconds a request may wait in the queue
+            shared: use one connection for every shared `Bath` on ip:port
+            adaptive_timeout, timeout_bounds: time out from the measured RTT
+            capabilities_file: JSON file keeping the fields the bath supports
+            transport: an I/O layer from `huber.transport.TRANSPORTS`
+        """
         self.ip = ip
-        self.open = False
-        self.reconnecting = False
+        if port is not None:
+            self.port = port
+        self.pipeline = pipeline
+        self.shared = shared
+        self._link: connection.Link | None = None
+        self.backoff = backoff
+        self.max_backoff = max_backoff
         self.timeouts = 0
         self.max_timeouts = max_timeouts
         self.comm_timeout = comm_timeout
-        self.connection = {}
-        self.lock = asyncio.Lock()
+        self.adaptive_timeout = adaptive_timeout
+        self.capabilities_file = capabilities_file
+        if transport not in TRANSPORTS:
+            raise ValueError(f'Unknown transport {transport}.')
+        self.transport = transport
+        self.capabilities: dict[str, bool] = {}
+        if capabilities_file is not None:
+            self.capabilities = capabilities.load(capabilities_file, self._device)
+        self.timeout_bounds = timeout_bounds
+        self.queue_deadline = queue_deadline
+        self.cache_ttl = cache_ttl
+        self.metrics = Metrics()
+        self.trace = trace
+        self.recorder = recorder
+        self._connected_before = False
+        self._cache: dict[int, tuple[float, int]] = {}
+        self._inflight: dict[int, asyncio.Future] = {}
 
     async def __aenter__(self):
         """Provide async entrance to context manager.
 
         Contrasting synchronous access, this will connect on initialization.
         """
-        await self._connect()
+        if not self.open:
+            await self._connect()
         return self
 
     def __exit__(self, *args):
@@ -57,21 +104,93 @@ class Bath:
         """Provide async exit to context manager."""
         self.close()
 
-    async def get(self):
+    async def get(self, fields=None, flat=False):
         """Get a pre-selected list of fields.
 
         Note that this is slow, as it chains multiple requests to construct
         a response. Look into the other `get` methods for single fields.
+
+        `fields` selects period-separated keys instead, with shell-style
+        wildcards (`'pump.*'`) or parent keys (`'temperature'`); each address
+        is read once. With `flat`, the result is keyed by full key, e.g.
+        `{'pump.speed': 0}`, instead of nested.
         """
+        if fields is None:
+            values = await self._get_many(self.defaults, True)
+            status = values.get('status')
+            if status:
+                faults = [f for f in ['warning', 'error'] if status[f]]
+                values.update(await self._get_many(faults, True))
+        else:
+            values = await self._get_many(expand(fields), True)
+        if flat:
+            return values
         output: dict[str, Any] = {}
-        for default in self.defaults:
-            util.set_nested(output, default, await self._get(default))
-        if output.get('status'):
-            for fault in ['warning', 'error']:
-                if output['status'][fault]:
-                    output[fault] = await self._get(fault)
+        for key, value in values.items():
+            util.set_nested(output, key, value)
         return output
 
+    async def get_snapshot(self, fields=None):
+        """Get the same fields as `get()`, as a `huber.snapshot.Snapshot`.
+
+        This skips building dictionaries, and decoding the status and faults,
+        until they're needed, which adds up at high sample rates.
+        """
+        timestamp = time.time()
+        if fields is None:
+            numbers = await self._get_many(self.defaults, True, raw=True)
+            status = Status(numbers.get('status') or 0)
+            faults = [f for f in ['warning', 'error'] if getattr(status, f)]
+            if faults:
+                numbers.update(await self._get_many(faults, True, raw=True))
+        else:
+            numbers = await self._get_many(expand(fields), True, raw=True)
+        return Snapshot.from_raw({k: v for k, v in numbers.items() if v is not None},
+                                 timestamp)
+
+    async def probe(self):
+        """Discover which fields this bath supports, returning `capabilities`.
+
+        Every field is read once. Fields that time out are left unknown.
+        """
+        for field in codec.fields.values():
+            try:
+                if await self._read(field) is not None:
+                    self._learn(field, True)
+            except codec.UnsupportedFieldError:
+                pass  # recorded by _parse
+        return self.capabilities
+
+    async def subscribe(self, fields=None, interval=1.0, delta=False, deadband=0.0):
+        """Poll fields on a fixed schedule, yielding timestamped samples.
+
+        Samples are dictionaries of the form `{'time': unix_time, 'values':
+        {key: value}}` with period-separated keys, defaulting to `defaults`.
+        `fields` may use wildcards and parent keys, and fields the bath
+        doesn't support are left out, as in `get`.
+        Polls are scheduled at multiples of `interval` from the first, so
+        slow reads don't accumulate drift; ticks that are already past are
+        skipped. With `delta` set, only values that changed since they were
+        last emitted are included, and samples with no changes are skipped.
+        `deadband` (a number, or a dictionary by key) sets how far a float
+        value must move to count as changed.
+        """
+        keys = expand(fields) if fields else list(self.defaults)
+        emitted: dict[str, Any] = {}
+        loop = asyncio.get_running_loop()
+        start, tick = loop.time(), 0
+        while True:
+            timestamp = time.time()
+            values = await self._get_many(keys, True)
+            if delta:
+                values = {k: v for k, v in values.items()
+                          if k not in emitted or _changed(k, emitted[k], v, deadband)}
+                emitted.update(values)
+            if values or not delta:
+                yield {'time': timestamp, 'values': values}
+            tick = util.next_tick(tick, start, interval, loop.time())
+            await asyncio.sleep(start + tick * interval - loop.time())
+
     async def start(self):
         """Start the controller and pump."""
         return await self._set('on', True)
@@ -128,6 +247,31 @@ class Bath:
         """Set the bath pump speed, in RPM."""
         return await self._set('pump.setpoint', value)
 
+    async def set_many(self, values):
+        """Write several properties, pipelining the writes if enabled.
+
+        Takes `{key: value}`, such as `{'temperature.setpoint': 50,
+        'pump.setpoint': 2000}`, and returns the value echoed back for each
+        key, or None if there was no reply. Unlike `set_setpoint`, a
+        mismatch doesn't raise, so callers can decide how much deviation to
+        tolerate.
+        """
+        fields = [self._writable(key, value) for key, value in values.items()]
+        commands = [field.encode(value) for field, value in zip(fields, values.values())]
+        if self.pipeline and len(fields) > 1:
+            responses = await self._write_and_read_many(fields, commands)
+        else:
+            responses = {field.address: await self._write_and_read(field, command)
+                         for field, command in zip(fields, commands)}
+        output = {}
+        for field in fields:
+            self._cache_invalidate(field)
+            response = responses.get(field.address)
+            if isinstance(response, Exception):
+                raise response
+            output[field.key] = None if response is None else field.decoder(response)
+        return output
+
     async def get_fill_level(self):
         """Get the thermostat fluid fill level, in [0, 1]."""
         return await self._get('fill')
@@ -141,84 +285,408 @@ class Bath:
         return await self._get('status')
 
     def close(self):
-        """Close the TCP connection."""
-        if self.open:
-            self.connection['writer'].close()
-        self.open = False
+        """Close the TCP connection, or leave it to other users if shared."""
+        if self._link is None:
+            return
+        if self.shared:
+            connection.release(self._link)
+            self._link = None
+        else:
+            self._link.disconnect()
+
+    @property
+    def link(self):
+        """Return the connection state, attaching to a shared link if needed.
+
+        Only requests and connects attach. The read-only properties below
+        report a detached bath as closed, so they never register a user.
+        """
+        if self._link is None:
+            if self.shared:
+                self._link = connection.acquire(self.ip, self.port)
+            else:
+                self._link = connection.Link()
+        return self._link
+
+    @property
+    def open(self):
+        """Return True if the TCP connection is open."""
+        return self._link is not None and self._link.open
+
+    @open.setter
+    def open(self, value):
+        self.link.open = value
+
+    @property
+    def connection(self):
+        """Return the connection's transport, from `huber.transport`, if any."""
+        return None if self._link is None else self._link.connection
+
+    @property
+    def scheduler(self):
+        """Return the request scheduler, shared along with the connection."""
+        return self.link.scheduler
+
+    @property
+    def reconnecting(self):
+        """Return True if the bath is unreachable and being retried."""
+        return self._link is not None and self._link.reconnecting
+
+    @property
+    def rtt(self):
+        """Return the smoothed round-trip time, in seconds, or None if unknown."""
+        return None if self._link is None else self._link.rtt.srtt
+
+    @property
+    def timeout(self):
+        """Return the connect and read timeout currently in use, in seconds."""
+        rto = None if self._link is None else self._link.rtt.rto
+        if not self.adaptive_timeout or rto is None:
+            return self.comm_timeout
+        floor, ceiling = self.timeout_bounds
+        return min(ceiling, max(floor, rto))
+
+    @property
+    def failures(self):
+        """Return the number of consecutive failed connection attempts."""
+        return 0 if self._link is None else self._link.failures
 
     async def _connect(self):
         """Asynchronously open a TCP connection with the server."""
-        self.open = False
-        reader, writer = await asyncio.open_connection(self.ip, self.port)
-        self.connection = {'reader': reader, 'writer': writer}
-        self.open = True
+        link = self.link
+        link.open = False
+        link.connection = await self._open_transport(link.lost)
+        link.open = True
+
+    async def _open_transport(self, on_lost):
+        """Return a new connected transport. Overridden by in-process baths."""
+        return await TRANSPORTS[self.transport].connect(
+            self.ip, self.port, on_lost, self.metrics.counters)
 
     async def _get(self, key):
         """Get a property as specified by the corresponding key."""
-        settings = util.get_field(key)
-        response = await self._write_and_read(settings['address'])
-        value = util.parse(response, settings)
-        if ('range' in settings and value is not None and not
-                settings['range'][0] <= value <= settings['range'][1]):
-            raise ValueError(f'Value {value} outside allowed range.')
-        return value
+        field = codec.fields[key]
+        return field.decode(await self._read(field))
+
+    async def _get_many(self, keys, skip_unsupported=False, raw=False):
+        """Get several properties, pipelining the requests if enabled.
+
+        With `skip_unsupported`, fields the bath doesn't implement are left
+        out of the result instead of raising `UnsupportedFieldError`. With
+        `raw`, values are the undecoded reply integers.
+        """
+        if skip_unsupported:
+            keys = [key for key in keys if self.capabilities.get(key, True)]
+        if not self.pipeline or len(keys) < 2:
+            output = {}
+            for key in keys:
+                try:
+                    if raw:
+                        output[key] = await self._read(codec.fields[key])
+                    else:
+                        output[key] = await self._get(key)
+                except codec.UnsupportedFieldError:
+                    if not skip_unsupported:
+                        raise
+            return output
+        fields = [codec.fields[key] for key in keys]
+        responses = {f.address: self._cache_lookup(f) for f in fields}
+        stale = [f for f in fields if responses[f.address] is None]
+        if stale:
+            fetched = await self._write_and_read_many(stale)
+            for field in stale:
+                if not isinstance(fetched[field.address], Exception):
+                    self._cache_store(field, fetched[field.address])
+            responses.update(fetched)
+        output = {}
+        for field in fields:
+            response = responses[field.address]
+            if isinstance(response, Exception):
+                if not skip_unsupported:
+                    raise response
+                continue
+            output[field.key] = response if raw else field.decode(response)
+        return output
+
+    async def _read(self, field):
+        """Read a field's raw value, through the cache if it is enabled.
+
+        Concurrent cache misses on the same address share a single request,
+        which is shielded so one caller giving up doesn't cancel the rest.
+        """
+        if self.cache_ttl is None:
+            return await self._write_and_read(field)
+        cached = self._cache_lookup(field)
+        if cached is not None:
+            return cached
+        future = self._inflight.get(field.address)
+        if future is None:
+            future = asyncio.ensure_future(self._write_and_read(field))
+            self._inflight[field.address] = future
+
+            def done(future):
+                if self._inflight.get(field.address) is future:
+                    del self._inflight[field.address]
+                if not future.cancelled() and future.exception() is None:
+                    self._cache_store(field, future.result())
+            future.add_done_callback(done)
+        return await asyncio.shield(future)
+
+    def _cache_lookup(self, field):
+        """Return a fresh cached raw value for a field, or None."""
+        entry = self._cache.get(field.address)
+        if entry is not None and entry[0] > time.monotonic():
+            return entry[1]
+        return None
+
+    def _cache_store(self, field, value):
+        """Cache a raw value for the field's configured time to live."""
+        if self.cache_ttl is None or value is None:
+            return
+        if isinstance(self.cache_ttl, dict):
+            ttl = self.cache_ttl.get(field.key, 0)
+        else:
+            ttl = self.cache_ttl
+        if ttl > 0:
+            self._cache[field.address] = (time.monotonic() + ttl, value)
+
+    def _cache_invalidate(self, field):
+        """Drop cached values made stale by writing to a field.
+
+        Status is dropped too, as writing `on`, `error` or `warning` changes
+        its bits.
+        """
+        self._cache.pop(field.address, None)
+        self._cache.pop(codec.fields['status'].address, None)
 
     async def _set(self, key, value):
         """Set property as specified by key."""
-        settings = util.get_field(key)
-        if 'writable' not in settings or not settings['writable']:
-            raise ValueError(f'Can not write to {key}.')
-        if ('range' in settings and not
-                settings['range'][0] <= value <= settings['range'][1]):
-            raise ValueError(f'Value {value} outside allowed range.')
-        encoded = int(100 * value if settings['format'] == 'f' else value)
-        response = await self._write_and_read(settings['address'], encoded)
-        new = util.parse(response, settings)
-        if new is None:
+        field = self._writable(key, value)
+        response = await self._write_and_read(field, field.encode(value))
+        self._cache_invalidate(field)
+        if response is None:
             raise OSError(f'Could not set {key}. (No response)')
-        if settings['format'] != 'b' and abs(new - value) > .1:
+        new = field.decoder(response)
+        if field.format not in ('b', 'fault') and abs(new - value) > .1:
             raise OSError(f'Could not set {key}. (Received response, but did not change)')
 
-    async def _write_and_read(self, address, value=None):
+    @staticmethod
+    def _writable(key, value):
+        """Return the field for a key, checking that `value` may be written to it."""
+        field = codec.fields[key]
+        if not field.writable:
+            raise ValueError(f'Can not write to {key}.')
+        if field.range is not None and not field.range[0] <= value <= field.range[1]:
+            raise ValueError(f'Value {value} outside allowed range.')
+        return field
+
+    async def _write_and_read(self, field, command=None):
         """Write a command and reads a response from the bath.
 
-        As these baths are commonly moved around, this has been expanded to
-        handle recovering from disconnects.  A lock is used to queue multiple requests.
+        `field` is a precompiled `huber.codec.Field`; `command` defaults to
+        its read command. As these baths are commonly moved around, this has
+        been expanded to handle recovering from disconnects. Requests are
+        queued by a priority scheduler, so writes jump ahead of telemetry.
         """
-        async with self.lock:  # lock releases on CancelledError
-            value = '****' if value is None else util.int_to_hex(value)
-            command = f'{{M{address:02X}{value}\r\n'
+        if command is not None:
+            priority = CONTROL
+        else:
+            command = field.command
+            priority = ALARM if field.key in ALARM_FIELDS else TELEMETRY
+        self._check_available()
+        queued = time.perf_counter()
+        async with self.scheduler.request(priority, self.queue_deadline):
+            acquired = time.perf_counter()
             await self._handle_connection()
-            response = await self._handle_communication(command)
+            sent = time.perf_counter()
+            response = await self._handle_communication(field, command)
+            received = time.perf_counter()
+        if response is not None:
+            self.link.rtt.sample(received - sent)
+        self.metrics.observe(field.key, acquired - queued, received - sent)
+        if self.trace is not None:
+            self.trace({'ip': self.ip, 'key': field.key, 'command': command,
+                        'response': response, 'lock_wait': acquired - queued,
+                        'wire': received - sent})
+        return self._parse(field, response)
+
+    def _parse(self, field, response):
+        """Parse a raw reply line, counting malformed and unsupported replies."""
+        try:
+            if isinstance(response, int):
+                value = codec.to_signed(response)  # pre-parsed by BathProtocol
+            else:
+                value = codec.parse_reply(response, field.prefix)
+        except codec.UnsupportedFieldError:
+            self.metrics.counters['not_implemented'] += 1
+            self._learn(field, False)
+            raise
+        if value is None and response is not None:
+            self.metrics.counters['malformed'] += 1
+            self.link.disconnect()  # e.g. another request's reply; resynchronize
+        if self.recorder is not None:
+            try:
+                self.recorder.record(field, value)
+            except Exception as e:
+                logger.warning(f'Recording {field.key} from {self.ip} failed: {e!r}')
+        return value
 
-        if (response is None or len(response) != 8
-           or response[:4] != f'{{S{address:02X}'):
-            return None
-        return util.hex_to_int(response[4:])
+    async def _write_and_read_many(self, fields, commands=None):
+        """Pipeline several commands and match the replies by address.
+
+        All commands are written at once, and each `{S` reply is matched to
+        its request by the echoed address, so ordering does not matter. Some
+        controllers only handle one command in flight. If any reply is
+        missing, pipelining is disabled and the missing addresses are sent
+        again serially. `commands` are write commands matching `fields`;
+        by default, the fields are read.
+        """
+        writes = {f.address: c for f, c in zip(fields, commands)} if commands else {}
+        fields = list({field.address: field for field in fields}.values())
+        command = b''.join(writes.get(field.address, field.command) for field in fields)
+        if writes:
+            priority = CONTROL
+        elif any(f.key in ALARM_FIELDS for f in fields):
+            priority = ALARM
+        else:
+            priority = TELEMETRY
+        self._check_available()
+        queued = time.perf_counter()
+        async with self.scheduler.request(priority, self.queue_deadline):
+            acquired = time.perf_counter()
+            await self._handle_connection()
+            sent = time.perf_counter()
+            replies = await self._handle_pipeline(fields, command)
+            received = time.perf_counter()
+        for field in fields:
+            self.metrics.observe(field.key, acquired - queued, received - sent)
+        if self.trace is not None:
+            self.trace({'ip': self.ip, 'key': [field.key for field in fields],
+                        'command': command, 'response': replies,
+                        'lock_wait': acquired - queued, 'wire': received - sent})
+
+        if any(field.address not in replies for field in fields):
+            logger.warning(f'{self.ip} dropped pipelined replies; '
+                           'falling back to serial requests.')
+            self.pipeline = False
+            self.link.disconnect()  # discard stray late replies
+        result: dict[int, Any] = {}
+        for field in fields:
+            try:
+                if field.address in replies:
+                    result[field.address] = self._parse(field, replies[field.address])
+                else:
+                    result[field.address] = await self._write_and_read(
+                        field, writes.get(field.address))
+            except codec.UnsupportedFieldError as e:
+                result[field.address] = e
+        return result
+
+    @property
+    def _device(self):
+        """Return the key identifying this bath in capability files."""
+        return f'{self.ip}:{self.port}'
+
+    def _learn(self, field, supported):
+        """Record whether the bath supports a field, saving any change."""
+        if self.capabilities.get(field.key) == supported:
+            return
+        self.capabilities[field.key] = supported
+        if self.capabilities_file is not None:
+            capabilities.save(self.capabilities_file, self._device, self.capabilities)
+
+    def _check_available(self):
+        """Fail fast if the last connection attempt failed and backoff is pending."""
+        link = self.link
+        if link.failures and time.monotonic() < link.retry_at:
+            raise BathUnavailableError(
+                f'{self.ip} is unreachable; next reconnect attempt in '
+                f'{link.retry_at - time.monotonic():.3g}s.')
 
     async def _handle_connection(self):
-        """Automatically maintain TCP connection."""
+        """Automatically maintain TCP connection, backing off on failures."""
+        link = self.link
+        if link.open:
+            return
+        self._check_available()
         try:
-            if not self.open:
-                await asyncio.wait_for(self._connect(), timeout=self.comm_timeout)
-            self.reconnecting = False
-        except (asyncio.TimeoutError, OSError):
-            if not self.reconnecting:
+            await asyncio.wait_for(self._connect(), timeout=self.timeout)
+        except (asyncio.TimeoutError, OSError) as e:
+            link.failures += 1
+            delay = min(self.max_backoff, self.backoff * 2 ** (link.failures - 1))
+            link.retry_at = time.monotonic() + delay
+            if not link.reconnecting:
                 logger.error(f'Connecting to {self.ip} timed out.')
-            self.reconnecting = True
+            link.reconnecting = True
+            raise BathUnavailableError(
+                f'Could not connect to {self.ip}; retrying in {delay:.3g}s.') from e
+        if link.reconnecting:
+            logger.info(f'Reconnected to {self.ip}.')
+        if self._connected_before:
+            self.metrics.counters['reconnects'] += 1
+        self._connected_before = True
+        link.reconnecting = False
+        link.failures = 0
+
+    async def _handle_communication(self, field, command):
+        """Send a command and return its reply, or None on timeout."""
+        self.metrics.counters['requests'] += 1
+        self.metrics.counters['bytes_sent'] += len(command)
+        try:
+            result = await self.connection.request(field.address, command, self.timeout)
+        except (asyncio.TimeoutError, OSError):
+            self._timed_out()
+            return None
+        self.timeouts = 0
+        return result
 
-    async def _handle_communication(self, command):
-        """Manage communication, including timeouts and logging."""
+    async def _handle_pipeline(self, fields, command):
+        """Write pipelined commands and collect the replies by address."""
+        self.metrics.counters['requests'] += len(fields)
+        self.metrics.counters['bytes_sent'] += len(command)
         try:
-            self.connection['writer'].write(command.encode())
-            future = self.connection['reader'].readuntil(b'\r\n')
-            line = await asyncio.wait_for(future, timeout=self.comm_timeout)
-            result = line.decode().strip()
+            replies = await self.connection.pipeline([f.address for f in fields],
+                                                     command, self.timeout)
+        except OSError:
+            replies = {}
+        if len(replies) < len(fields):
+            self._timed_out()
+        else:
             self.timeouts = 0
-        except (asyncio.TimeoutError, TypeError, OSError):
-            self.timeouts += 1
-            if self.timeouts == self.max_timeouts:
-                logger.error(f'Reading from {self.ip} timed out '
-                             f'{self.timeouts} times.')
-            result = None
-        return result
+        return replies
+
+    def _timed_out(self):
+        """Count a request that got no reply."""
+        self.link.rtt.timed_out()
+        self.metrics.counters['timeouts'] += 1
+        self.timeouts += 1
+        if self.timeouts == self.max_timeouts:
+            logger.error(f'Reading from {self.ip} timed out '
+                         f'{self.timeouts} times.')
+
+
+def _changed(key, old, new, deadband):
+    """Check if a value moved, treating float changes within `deadband` as noise."""
+    if old is None or new is None or codec.fields[key].format not in ('f', '%'):
+        return old != new
+    if isinstance(deadband, dict):
+        deadband = deadband.get(key, 0.0)
+    return abs(new - old) > deadband
+
+
+@lru_cache(maxsize=256)
+def _expand(patterns):
+    """Resolve a tuple of key patterns to field keys, in order, without repeats."""
+    keys: dict[str, None] = {}
+    for pattern in patterns:
+        matches = [key for key in codec.fields
+                   if fnmatchcase(key, pattern) or key.startswith(f'{pattern}.')]
+        if not matches:
+            raise ValueError(f'Unknown field {pattern}.')
+        keys.update(dict.fromkeys(matches))
+    return list(keys)
+
+
+def expand(fields):
+    """Resolve period-separated keys, parents and wildcards to field keys."""
+    return _expand(tuple([fields] if isinstance(fields, str) else fields))
@@ -0,0 +1,110 @@
+"""Concurrent polling of many Huber baths.
+
+Distributed under the GNU General Public License v2
+Copyright (C) 2017 NuMat Technologies
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from typing import Any
+
+from huber import metrics
+from huber.driver import Bath, BathUnavailableError
+
+logger = logging.getLogger('huber')
+
+
+class BathFleet:
+    """Poll a collection of Huber baths concurrently.
+
+    One `Bath` connection is kept per IP. Each cycle polls every bath with at
+    most `concurrency` requests in flight and gives each bath `deadline`
+    seconds to respond, so a slow or dead bath reports `None` instead of
+    stalling the rest of the fleet.
+    """
+
+    def __init__(self, ips, concurrency=64, deadline=2.0, **kwargs):
+        """Create one `Bath` per IP. Extra arguments are passed to `Bath`.
+
+        Entries of the form 'host:port' connect to a non-default port.
+        """
+        self.baths = {ip: _create_bath(ip, **kwargs) for ip in ips}
+        self.concurrency = concurrency
+        self.deadline = deadline
+        self.last_cycle: dict[str, Any] = {}
+
+    async def __aenter__(self):
+        """Provide async entrance to context manager."""
+        return self
+
+    async def __aexit__(self, *args):
+        """Provide async exit to context manager."""
+        self.close()
+
+    async def get(self, fields=None, flat=False):
+        """Poll every bath once and return snapshots keyed by IP.
+
+        `fields` and `flat` are passed to `Bath.get`. Baths that fail or miss
+        the deadline map to `None`. Timing of the cycle is stored in
+        `last_cycle`.
+        """
+        semaphore = asyncio.Semaphore(self.concurrency)
+        durations: dict[str, float] = {}
+
+        async def poll(ip, bath):
+            async with semaphore:
+                start = time.perf_counter()
+                try:
+                    return await asyncio.wait_for(bath.get(fields, flat),
+                                                  timeout=self.deadline)
+                except BathUnavailableError:
+                    pass  # logged by the driver, and fails fast until retried
+                except asyncio.TimeoutError:
+                    logger.warning(f'Polling {ip} exceeded {self.deadline}s deadline.')
+                except Exception as e:
+                    logger.warning(f'Polling {ip} failed: {e!r}')
+                finally:
+                    durations[ip] = time.perf_counter() - start
+                return None
+
+        start = time.perf_counter()
+        results = await asyncio.gather(*(poll(ip, bath) for ip, bath in self.baths.items()))
+        output = dict(zip(self.baths, results))
+        self.last_cycle = {
+            'duration': time.perf_counter() - start,
+            'slowest': max(durations.values(), default=0.0),
+            'failed': [ip for ip, result in output.items() if result is None],
+            'per_bath': durations,
+        }
+        return output
+
+    def prometheus(self):
+        """Render every bath's request metrics in Prometheus text format."""
+        return metrics.render(({'ip': ip}, bath.metrics) for ip, bath in self.baths.items())
+
+    def close(self):
+        """Close all TCP connections."""
+        for bath in self.baths.values():
+            bath.close()
+
+
+async def snapshot(baths, fields=None, flat=False, return_exceptions=False):
+    """Read several `Bath` objects concurrently, returning results keyed by 'ip:port'.
+
+    `fields` and `flat` are passed to `Bath.get`. As with `asyncio.gather`,
+    the first exception is raised unless `return_exceptions` is set, in
+    which case failed baths map to their exception.
+    """
+    results = await asyncio.gather(*(bath.get(fields, flat) for bath in baths),
+                                   return_exceptions=return_exceptions)
+    return {f'{bath.ip}:{bath.port}': result for bath, result in zip(baths, results)}
+
+
+def _create_bath(address, **kwargs):
+    """Create a `Bath` from an IP, splitting off an optional ':port' suffix."""
+    host, sep, port = address.rpartition(':')
+    if sep and port.isdigit() and ':' not in host:
+        return Bath(host, port=int(port), **kwargs)
+    return Bath(address, **kwargs)
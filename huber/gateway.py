@@ -0,0 +1,221 @@
+"""Caching HTTP gateway that fronts many baths for many clients.
+
+The gateway keeps one connection per bath, polls every bath once per
+interval and serves the cached snapshots, so controller load no longer grows
+with the number of dashboards and scripts. It uses only the standard library.
+
+    GET  /baths                   latest snapshot of every bath, keyed by IP
+    GET  /baths/<ip>              latest snapshot of one bath
+    GET  /stream                  NDJSON stream, one line per poll cycle
+    GET  /metrics                 request metrics in Prometheus text format
+    POST /baths/<ip>/<command>    forward a write, with body {"value": ...}
+
+Distributed under the GNU General Public License v2
+Copyright (C) 2017 NuMat Technologies
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import time
+from typing import Any
+
+from huber import util
+from huber.fleet import BathFleet
+
+logger = logging.getLogger('huber')
+
+# The JSON type each command's value must have, or None if it takes no value.
+COMMANDS: dict[str, Any] = {
+    'start': None,
+    'stop': None,
+    'toggle': bool,
+    'set_setpoint': (int, float),
+    'set_pump_speed': (int, float),
+    'clear_error': None,
+    'clear_warning': None,
+}
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found',
+           405: 'Method Not Allowed', 502: 'Bad Gateway'}
+
+
+class Gateway:
+    """Poll a fleet of baths on a schedule and serve the results over HTTP."""
+
+    def __init__(self, ips, interval=1.0, host='127.0.0.1', port=8080,
+                 queue_size=16, **kwargs):
+        """Configure the gateway. Extra arguments are passed to `BathFleet`."""
+        self.fleet = BathFleet(ips, **kwargs)
+        self.interval = interval
+        self.host = host
+        self.port = port
+        self.queue_size = queue_size
+        self.snapshot: dict[str, Any] = {'time': None, 'baths': {}}
+        self.subscribers: set[asyncio.Queue] = set()
+        self._server: asyncio.AbstractServer | None = None
+        self._poller: asyncio.Future | None = None
+
+    async def __aenter__(self):
+        """Start polling and serving."""
+        await self.start()
+        return self
+
+    async def __aexit__(self, *args):
+        """Stop polling and serving."""
+        await self.stop()
+
+    async def start(self):
+        """Start polling and serving. With `port=0`, the chosen port is stored."""
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._poller = asyncio.ensure_future(self._poll())
+
+    async def stop(self):
+        """Stop polling and serving, and close all bath connections."""
+        if self._poller is not None:
+            self._poller.cancel()
+            await asyncio.gather(self._poller, return_exceptions=True)
+        if self._server is not None:
+            self._server.close()
+        for queue in self.subscribers:
+            util.offer(queue, None)
+        self.fleet.close()
+
+    async def _poll(self):
+        """Poll the fleet at multiples of `interval` and publish the results."""
+        loop = asyncio.get_running_loop()
+        start, tick = loop.time(), 0
+        while True:
+            timestamp = time.time()
+            self.snapshot = {'time': timestamp, 'baths': await self.fleet.get()}
+            line = (json.dumps(self.snapshot) + '\n').encode()
+            for queue in self.subscribers:
+                util.offer(queue, line)
+            tick = util.next_tick(tick, start, self.interval, loop.time())
+            await asyncio.sleep(start + tick * self.interval - loop.time())
+
+    async def _handle(self, reader, writer):
+        """Serve a single HTTP request, then close the connection."""
+        try:
+            method, path, body = await _read_request(reader)
+            if method == 'GET' and path == '/stream':
+                await self._stream(writer)
+            else:
+                status, content_type, content = await self._route(method, path, body)
+                writer.write(_response(status, content_type, content))
+                await writer.drain()
+        except (ValueError, asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def _route(self, method, path, body):
+        """Return (status, content type, content) for a non-streaming request."""
+        parts = [p for p in path.split('/') if p]
+        if method == 'GET' and parts == ['metrics']:
+            return 200, 'text/plain; version=0.0.4', self.fleet.prometheus().encode()
+        if not parts or parts[0] != 'baths':
+            return _error(404, 'Unknown path.')
+        if method == 'GET' and len(parts) == 1:
+            return _json(200, self.snapshot)
+        if len(parts) < 2 or parts[1] not in self.fleet.baths:
+            return _error(404, 'Unknown bath.')
+        ip = parts[1]
+        if method == 'GET' and len(parts) == 2:
+            return _json(200, {'time': self.snapshot['time'],
+                               'bath': self.snapshot['baths'].get(ip)})
+        if method == 'POST' and len(parts) == 3 and parts[2] in COMMANDS:
+            return await self._write(ip, parts[2], body)
+        return _error(405, 'Unsupported method.')
+
+    async def _write(self, ip, command, body):
+        """Forward a write command to a bath through the driver."""
+        expected = COMMANDS[command]
+        args = []
+        if expected is not None:
+            try:
+                value = json.loads(body or '{}')['value']
+            except (ValueError, KeyError, TypeError):
+                return _error(400, 'Expected a JSON body of the form {"value": ...}.')
+            # JSON true/false load as bools, which are also ints.
+            if not isinstance(value, expected) or (expected is not bool and
+                                                   isinstance(value, bool)):
+                kind = 'boolean' if expected is bool else 'number'
+                return _error(400, f'Expected a {kind} value for {command}.')
+            args.append(value)
+        try:
+            await getattr(self.fleet.baths[ip], command)(*args)
+        except ValueError as e:
+            return _error(400, str(e))
+        except (OSError, asyncio.TimeoutError) as e:
+            return _error(502, str(e) or repr(e))
+        return _json(200, {'ok': True})
+
+    async def _stream(self, writer):
+        """Send each poll cycle's snapshot as a line of NDJSON until disconnect."""
+        queue: asyncio.Queue = asyncio.Queue(self.queue_size)
+        self.subscribers.add(queue)
+        try:
+            writer.write(b'HTTP/1.1 200 OK\r\nContent-Type: application/x-ndjson\r\n'
+                         b'Cache-Control: no-cache\r\nConnection: close\r\n\r\n')
+            if self.snapshot['time'] is not None:
+                writer.write((json.dumps(self.snapshot) + '\n').encode())
+            while (line := await queue.get()) is not None:
+                writer.write(line)
+                await writer.drain()
+        finally:
+            self.subscribers.discard(queue)
+
+
+async def _read_request(reader):
+    """Parse an HTTP request into (method, path, body)."""
+    request_line = (await reader.readuntil(b'\r\n')).decode('latin-1')
+    method, path, _ = request_line.split(' ', 2)
+    headers = {}
+    while (line := await reader.readuntil(b'\r\n')) != b'\r\n':
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    length = int(headers.get('content-length', 0))
+    body = (await reader.readexactly(length)).decode() if length else ''
+    return method, path.split('?', 1)[0], body
+
+
+def _response(status, content_type, content):
+    """Build a complete HTTP response."""
+    return (f'HTTP/1.1 {status} {REASONS[status]}\r\nContent-Type: {content_type}\r\n'
+            f'Content-Length: {len(content)}\r\nConnection: close\r\n\r\n'
+            ).encode() + content
+
+
+def _json(status, data):
+    """Return a JSON response tuple."""
+    return status, 'application/json', json.dumps(data).encode()
+
+
+def _error(status, message):
+    """Return a JSON error response tuple."""
+    return _json(status, {'error': message})
+
+
+def command_line(args=None):
+    """Command-line interface to the caching gateway."""
+    import argparse
+    parser = argparse.ArgumentParser(description="Serve cached Huber bath data "
+                                     "to many clients over HTTP.")
+    parser.add_argument('ips', nargs='+', help="The bath IP addresses.")
+    parser.add_argument('--host', default='127.0.0.1', help="Interface to serve on.")
+    parser.add_argument('--port', '-p', default=8080, type=int, help="Port to serve on.")
+    parser.add_argument('--interval', '-i', default=1.0, type=float,
+                        help="Seconds between polls of each bath.")
+    args = parser.parse_args(args)
+
+    async def serve():
+        async with Gateway(args.ips, args.interval, args.host, args.port):
+            await asyncio.Event().wait()
+
+    asyncio.run(serve())
+
+
+if __name__ == '__main__':
+    command_line()
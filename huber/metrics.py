@@ -0,0 +1,126 @@
+"""Request metrics for Huber baths, with Prometheus text rendering.
+
+Distributed under the GNU General Public License v2
+Copyright (C) 2017 NuMat Technologies
+"""
+from __future__ import annotations
+
+from bisect import bisect_left
+
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+COUNTERS = {
+    'requests': 'Commands sent to the bath.',
+    'timeouts': 'Requests that got no reply in time.',
+    'reconnects': 'Connections opened after the first.',
+    'malformed': 'Replies that could not be parsed or had the wrong address.',
+    'not_implemented': 'Replies of 7FFF, for fields the model does not support.',
+    'bytes_sent': 'Bytes written to the bath.',
+    'bytes_received': 'Bytes read from the bath.',
+}
+
+
+class Histogram:
+    """Fixed-bucket latency histogram, in seconds."""
+
+    __slots__ = ('count', 'counts', 'sum')
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        """Record a single observation."""
+        self.counts[bisect_left(BUCKETS, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def snapshot(self):
+        """Return cumulative bucket counts, keyed by upper bound."""
+        buckets, total = {}, 0
+        for bound, count in zip((*BUCKETS, float('inf')), self.counts):
+            total += count
+            buckets[bound] = total
+        return {'count': self.count, 'sum': self.sum, 'buckets': buckets}
+
+
+class Metrics:
+    """Counters and latency histograms for one bath's requests.
+
+    `latency` is the wire time per field key. `lock_wait` is the time spent
+    queued behind other requests and `wire` the time from write to reply,
+    so slow snapshots can be traced to contention or to the network.
+    """
+
+    def __init__(self):
+        self.latency: dict[str, Histogram] = {}
+        self.lock_wait = Histogram()
+        self.wire = Histogram()
+        self.counters = dict.fromkeys(COUNTERS, 0)
+
+    def observe(self, key, lock_wait, wire):
+        """Record the timing of one request."""
+        histogram = self.latency.get(key)
+        if histogram is None:
+            histogram = self.latency[key] = Histogram()
+        histogram.observe(wire)
+        self.lock_wait.observe(lock_wait)
+        self.wire.observe(wire)
+
+    def snapshot(self):
+        """Return all metrics as a dictionary."""
+        return {
+            **self.counters,
+            'lock_wait': self.lock_wait.snapshot(),
+            'wire': self.wire.snapshot(),
+            'latency': {key: h.snapshot() for key, h in self.latency.items()},
+        }
+
+    def prometheus(self, labels=None):
+        """Render in the Prometheus text exposition format."""
+        return render([(labels or {}, self)])
+
+
+def render(items):
+    """Render `(labels, Metrics)` pairs, e.g. one per bath, as Prometheus text."""
+    items = list(items)
+    lines = []
+    for name, description in COUNTERS.items():
+        lines += [f'# HELP huber_{name}_total {description}',
+                  f'# TYPE huber_{name}_total counter']
+        lines += [f'huber_{name}_total{_labels(labels)} {metrics.counters[name]}'
+                  for labels, metrics in items]
+    for name, description in [('lock_wait', 'Time queued behind other requests.'),
+                              ('wire', 'Time from command write to reply.')]:
+        lines += [f'# HELP huber_{name}_seconds {description}',
+                  f'# TYPE huber_{name}_seconds histogram']
+        for labels, metrics in items:
+            lines += _histogram(f'huber_{name}_seconds', labels, getattr(metrics, name))
+    lines += ['# HELP huber_request_seconds Wire time per field.',
+              '# TYPE huber_request_seconds histogram']
+    for labels, metrics in items:
+        for key, histogram in metrics.latency.items():
+            lines += _histogram('huber_request_seconds', {**labels, 'field': key}, histogram)
+    return '\n'.join(lines) + '\n'
+
+
+def _histogram(name, labels, histogram):
+    """Render one histogram's bucket, sum and count lines."""
+    snapshot = histogram.snapshot()
+    lines = [f'{name}_bucket{_labels({**labels, "le": _bound(bound)})} {count}'
+             for bound, count in snapshot['buckets'].items()]
+    lines.append(f'{name}_sum{_labels(labels)} {snapshot["sum"]}')
+    lines.append(f'{name}_count{_labels(labels)} {snapshot["count"]}')
+    return lines
+
+
+def _bound(bound):
+    """Format a bucket bound as Prometheus expects."""
+    return '+Inf' if bound == float('inf') else repr(bound)
+
+
+def _labels(labels):
+    """Format a label set, e.g. `{ip="10.0.0.2"}`."""
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{k}="{v}"' for k, v in labels.items()) + '}'
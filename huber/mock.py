@@ -1,9 +1,23 @@
-"""Mock interface to a Huber bath."""
+"""Mock interface to a Huber bath.
+
+`Bath` returns canned and random values, for tests of code built on the
+driver. `SimulatedBath` runs the real driver against `Thermostat`, a seeded
+physical model of a bath, on a `VirtualClock` that can run far faster than
+real time, for soak-testing pollers and control loops.
+"""
+from __future__ import annotations
 
 import asyncio
+import heapq
+import itertools
+import math
 import random
+import time
 
+from huber import codec, util
 from huber.driver import Bath as realBath
+from huber.driver import expand
+from huber.transport import LocalTransport
 
 
 class Bath(realBath):
@@ -11,6 +25,7 @@ class Bath(realBath):
 
     def __init__(self, *args, **kwargs):
         """Init fixed variables."""
+        super().__init__(*args, **kwargs)
         self.temp_setpoint = 50
         self.pump_setpoint = 500
         self.on = False
@@ -23,10 +38,10 @@ class Bath(realBath):
         """Mock closing the TCP connection."""
         self.open = False
 
-    async def get(self):
+    async def get(self, fields=None, flat=False):
         """Return data structure randomly populated."""
         await asyncio.sleep(random.random() * 0.25)
-        return {
+        output = {
             'on': self.on,  # Temperature control (+pump) active
             'temperature': {
                 'bath': 23.49,                  # Internal (bath) temperature, °C
@@ -48,6 +63,16 @@ class Bath(realBath):
             'fill': random.random(),             # Oil level, [0, 1]
             'maintenance': random.random() * 365,  # Time until maintenance alarm, days
         }
+        if fields is None and not flat:
+            return output
+        values = {key: util.get_field(key, output) for key in expand(fields or codec.fields)
+                  if key.split('.')[0] in output}
+        if flat:
+            return values
+        nested: dict = {}
+        for key, value in values.items():
+            util.set_nested(nested, key, value)
+        return nested
 
     async def start(self):
         """Start the controller and pump."""
@@ -108,3 +133,210 @@ class Bath(realBath):
     async def get_warning(self):
         """Get the most recent warning, as a dictionary."""
         return (await self.get()).get('warning')
+
+
+class VirtualClock:
+    """Simulated time, in seconds, running `speed` times faster than real time.
+
+    With `speed=0`, time only moves through `advance` and `sleep`, so runs
+    are fully deterministic and take no real time at all. Sleepers wait in a
+    queue of wake-up times, and once the loop has run the tasks that were
+    ready, the clock jumps to the earliest one and wakes everything due, so
+    concurrent sleepers share simulated time. Tasks waiting on anything else,
+    such as real I/O, don't hold the clock back.
+    """
+
+    def __init__(self, speed=1.0):
+        """Start the clock at zero."""
+        self.speed = speed
+        self._offset = 0.0
+        self._start = time.monotonic()
+        self._sleepers: list = []  # heap of (wake time, order, future)
+        self._order = itertools.count()
+        self._stepping = False
+
+    def time(self):
+        """Return the simulated time."""
+        return self._offset + (time.monotonic() - self._start) * self.speed
+
+    def advance(self, seconds):
+        """Move the clock forward, waking sleepers that are due."""
+        self._offset += seconds
+        self._wake()
+
+    async def sleep(self, seconds):
+        """Wait for `seconds` of simulated time."""
+        if self.speed:
+            await asyncio.sleep(seconds / self.speed)
+            return
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        heapq.heappush(self._sleepers,
+                       (self.time() + max(seconds, 0), next(self._order), future))
+        self._schedule(loop)
+        await future
+
+    def _schedule(self, loop):
+        """Step the clock once the tasks that are ready now have run."""
+        if not self._stepping:
+            self._stepping = True
+            loop.call_soon(self._step, loop)
+
+    def _step(self, loop):
+        """Jump to the earliest wake-up time and wake the sleepers due by then."""
+        self._stepping = False
+        while self._sleepers and self._sleepers[0][2].done():
+            heapq.heappop(self._sleepers)  # cancelled
+        if self._sleepers:
+            self._offset = max(self._offset, self._sleepers[0][0])
+            self._wake()
+        if self._sleepers:
+            self._schedule(loop)
+
+    def _wake(self):
+        """Resolve every sleeper whose wake-up time has passed."""
+        while self._sleepers and self._sleepers[0][0] <= self.time():
+            future = heapq.heappop(self._sleepers)[2]
+            if not future.done():
+                future.set_result(None)
+
+
+class Thermostat:
+    """Physical model of a Huber bath, answering PB protocol commands.
+
+    The bath temperature follows the setpoint (or `ambient`, when off) as a
+    first-order system with `time_constant` seconds, and the process sensor
+    lags it by `sensor_lag`. The pump spins up toward its setpoint and its
+    pressure grows with the square of speed. Readings carry Gaussian `noise`
+    and, with `fault_rate` (per simulated hour), random faults are raised
+    from `faults.csv`. All randomness comes from `seed`.
+    """
+
+    def __init__(self, clock=None, seed=None, ambient=22.0, time_constant=300.0,
+                 sensor_lag=30.0, noise=0.01, fault_rate=0.0):
+        """Initialize the bath at rest and at ambient temperature."""
+        self.clock = clock or VirtualClock()
+        self.random = random.Random(seed)
+        self.ambient = ambient
+        self.time_constant = time_constant
+        self.sensor_lag = sensor_lag
+        self.noise = noise
+        self.fault_rate = fault_rate
+        self.on = False
+        self.setpoint = 20.0
+        self.temperature = ambient
+        self.process_temperature = ambient
+        self.pump_setpoint = 2000
+        self.pump_speed = 0.0
+        self.fill = 0.8
+        self.error = 0
+        self.warning = 0
+        self.last_step = self.clock.time()
+
+    def inject(self, code):
+        """Raise a fault by its code in `faults.csv`.
+
+        Errors stop temperature control until cleared; warnings don't.
+        """
+        fault = util.get_faults().get(code)
+        if fault is None:
+            raise ValueError(f'Unknown fault code {code}.')
+        if fault['type'] == 'warning':
+            self.warning = code
+        elif fault['type'].endswith('error'):
+            self.error = code
+            self.on = False
+        else:
+            raise ValueError(f'Fault {code} is a {fault["type"]}, not an error or warning.')
+
+    def step(self):
+        """Advance the model to the current simulated time."""
+        now = self.clock.time()
+        dt, self.last_step = now - self.last_step, now
+        if dt <= 0:
+            return
+        if self.fault_rate and self.random.random() < -math.expm1(-self.fault_rate * dt / 3600):
+            codes = [code for code, fault in util.get_faults().items()
+                     if fault['type'] in ('warning', 'resettable error')]
+            self.inject(self.random.choice(codes))
+        target = self.setpoint if self.on else self.ambient
+        self.temperature += (target - self.temperature) * -math.expm1(-dt / self.time_constant)
+        self.process_temperature += ((self.temperature - self.process_temperature) *
+                                     -math.expm1(-dt / self.sensor_lag))
+        speed = self.pump_setpoint if self.on else 0
+        self.pump_speed += (speed - self.pump_speed) * -math.expm1(-dt / 2.0)
+
+    @property
+    def registers(self):
+        """Return the raw register values for the current state."""
+        pressure = 250 * (self.pump_speed / 4500) ** 2
+        status = (self.on | (self.pump_speed > 1) << 1 | (self.pump_speed > 1) << 4 |
+                  bool(self.error) << 8 | bool(self.warning) << 9)
+        return {
+            0x00: round(100 * self.setpoint),
+            0x01: round(100 * (self.temperature + self.random.gauss(0, self.noise))),
+            0x03: round(100 * pressure),
+            0x05: self.error,
+            0x06: self.warning,
+            0x07: round(100 * (self.process_temperature + self.random.gauss(0, self.noise))),
+            0x0a: status,
+            0x0f: round(1000 * self.fill),
+            0x14: int(self.on),
+            0x26: round(self.pump_speed),
+            0x48: self.pump_setpoint,
+            0x5c: max(0, 338 - int(self.clock.time() // 86400)),
+        }
+
+    def write(self, address, number):
+        """Apply a raw register write."""
+        if address == 0x00:
+            self.setpoint = number / 100
+        elif address == 0x14:
+            self.on = bool(number) and not self.error
+        elif address == 0x48:
+            self.pump_setpoint = number
+        elif address == 0x05:
+            self.error = 0
+        elif address == 0x06:
+            self.warning = 0
+
+    def respond(self, command):
+        """Return the reply to a single `{M` command, without line ending."""
+        self.step()
+        address = int(command[2:4], 16)
+        if command[4:8] != '****' and address in (0x00, 0x05, 0x06, 0x14, 0x48):
+            self.write(address, util.hex_to_int(command[4:8]))
+        number = self.registers.get(address)
+        if number is None:
+            return f'{{S{address:02X}7FFF'
+        return f'{{S{address:02X}{util.int_to_hex(number)}'
+
+
+class SimulatedBath(realBath):
+    """Run the real driver against a `Thermostat` instead of a TCP connection.
+
+    Everything above the wire (scheduling, caching, parsing, capabilities)
+    is the real driver, so this behaves like `huber.Bath` on real equipment.
+    """
+
+    def __init__(self, ip='simulated', model=None, **kwargs):
+        """Attach a model, by default a new `Thermostat` on a real-time clock."""
+        super().__init__(ip, **kwargs)
+        self.model = model or Thermostat()
+
+    async def _open_transport(self, on_lost):
+        """Answer from the model instead of a TCP connection."""
+        return ModelTransport(self.model, on_lost, self.metrics.counters)
+
+
+class ModelTransport(LocalTransport):
+    """Answer commands from a `Thermostat`."""
+
+    def __init__(self, model, on_lost=None, counters=None):
+        """Attach the model."""
+        super().__init__(on_lost, counters)
+        self.model = model
+
+    async def answer(self, commands):
+        """Return the model's reply to each command."""
+        return [self.model.respond(command) for command in commands]
@@ -0,0 +1,199 @@
+"""Run timed setpoint and pump speed profiles across several baths.
+
+A `Profile` is a list of `Point`s, each a time in seconds from the start and
+a temperature setpoint and/or pump speed, with linear ramps in between.
+`ProfileRunner` steps every bath through its profile on a shared schedule:
+once per tick it computes each bath's targets, sends every bath's changed
+values in one batch (pipelined, if the bath has `pipeline=True`), checks the
+echoed values and records how far timing and values strayed from the plan.
+
+    runner = ProfileRunner({
+        bath_a: [Point(0, 20), Point(600, 80), Point(1200, 80, 3000)],
+        bath_b: [Point(0, 20), Point(1200, 40)],
+    }, tick=5)
+    report = await runner.run()
+    print(report.summary())
+
+Distributed under the GNU General Public License v2
+Copyright (C) 2017 NuMat Technologies
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import math
+import time
+from bisect import bisect_right
+from typing import NamedTuple
+
+from huber import codec, util
+
+logger = logging.getLogger('huber')
+
+CHANNELS = {'setpoint': 'temperature.setpoint', 'pump_speed': 'pump.setpoint'}
+
+
+class Point(NamedTuple):
+    """A target at `time` seconds into a profile. None leaves a channel alone."""
+
+    time: float
+    setpoint: float | None = None
+    pump_speed: int | None = None
+
+
+class Write(NamedTuple):
+    """The outcome of one write in a profile run."""
+
+    ip: str
+    key: str
+    planned: float
+    sent: float
+    target: float
+    achieved: float | None
+
+
+class Profile:
+    """Piecewise-linear targets for one bath."""
+
+    def __init__(self, points):
+        """Sort and check the points. Each channel ramps between the points that set it.
+
+        Raises ValueError for a value outside its field's range, before any
+        bath is written to. Ramps between valid points stay in range.
+        """
+        points = sorted((Point(*point) for point in points), key=lambda p: p.time)
+        if not points:
+            raise ValueError('A profile needs at least one point.')
+        self.channels = {}
+        for name, key in CHANNELS.items():
+            values = [(p.time, getattr(p, name)) for p in points
+                      if getattr(p, name) is not None]
+            low, high = codec.fields[key].range
+            for t, value in values:
+                if not low <= value <= high:
+                    raise ValueError(f'{name} {value} at {t}s outside allowed '
+                                     f'range [{low}, {high}].')
+            if values:
+                self.channels[key] = values
+        self.duration = points[-1].time
+
+    def at(self, t):
+        """Return `{key: target}` at `t` seconds. Channels not started yet are left out."""
+        targets = {}
+        for key, values in self.channels.items():
+            i = bisect_right(values, (t, float('inf')))
+            if i == 0:
+                continue
+            if i == len(values):
+                value = values[-1][1]
+            else:
+                (t0, v0), (t1, v1) = values[i - 1], values[i]
+                value = v0 + (v1 - v0) * (t - t0) / (t1 - t0)
+            targets[key] = round(value) if key == 'pump.setpoint' else round(value, 2)
+        return targets
+
+
+class Report:
+    """Planned versus achieved timing and values from a `ProfileRunner`."""
+
+    def __init__(self, tolerance):
+        self.tolerance = tolerance
+        self.ticks: list[tuple[float, float]] = []
+        self.writes: list[Write] = []
+        self.skipped = 0
+
+    @property
+    def failures(self):
+        """Return the writes that got no echo, or one outside the tolerance."""
+        return [w for w in self.writes if w.achieved is None or
+                abs(w.achieved - w.target) > self.tolerance]
+
+    def summary(self):
+        """Summarize timing jitter and value errors, in seconds and field units."""
+        jitter = [actual - planned for planned, actual in self.ticks]
+        errors: dict[str, dict[str, float]] = {}
+        for w in self.writes:
+            if w.achieved is not None:
+                worst = errors.setdefault(w.ip, {})
+                worst[w.key] = max(worst.get(w.key, 0.0), abs(w.achieved - w.target))
+        return {
+            'ticks': len(self.ticks),
+            'skipped': self.skipped,
+            'jitter': {'max': max(jitter, default=0.0),
+                       'mean': sum(jitter) / len(jitter) if jitter else 0.0},
+            'writes': len(self.writes),
+            'failures': len(self.failures),
+            'max_error': errors,
+        }
+
+
+class ProfileRunner:
+    """Step several baths through their profiles on one schedule.
+
+    Ticks are scheduled at multiples of `tick` from the start on a monotonic
+    clock, so lateness doesn't accumulate; ticks that are already past when
+    the previous one finishes are skipped and counted. Only values that
+    changed since the last tick are written. `clock` may be any object with
+    `time()` and `async sleep(seconds)`, such as `huber.mock.VirtualClock`.
+    """
+
+    def __init__(self, profiles, tick=1.0, tolerance=0.1, clock=None):
+        """Take `{bath: Profile or list of points}`."""
+        self.profiles = {bath: p if isinstance(p, Profile) else Profile(p)
+                         for bath, p in profiles.items()}
+        self.tick = tick
+        self.tolerance = tolerance
+        self.clock = clock or _MonotonicClock()
+        self.duration = max(p.duration for p in self.profiles.values())
+
+    async def run(self):
+        """Run every profile to its end, returning a `Report`."""
+        report = Report(self.tolerance)
+        written: dict = {bath: {} for bath in self.profiles}
+        last = math.ceil(self.duration / self.tick)
+        start, n = self.clock.time(), 0
+        while True:
+            offset = min(n * self.tick, self.duration)
+            delay = start + offset - self.clock.time()
+            if delay > 0:
+                await self.clock.sleep(delay)
+            sent = self.clock.time()
+            report.ticks.append((start + offset, sent))
+            batches = {}
+            for bath, profile in self.profiles.items():
+                targets = {k: v for k, v in profile.at(offset).items()
+                           if written[bath].get(k) != v}
+                if targets:
+                    batches[bath] = targets
+            results = await asyncio.gather(*(bath.set_many(targets)
+                                             for bath, targets in batches.items()),
+                                           return_exceptions=True)
+            for (bath, targets), result in zip(batches.items(), results):
+                echoes: dict = {}
+                if isinstance(result, BaseException):
+                    logger.warning(f'Profile write to {bath.ip} failed: {result!r}')
+                else:
+                    echoes = result
+                for key, target in targets.items():
+                    achieved = echoes.get(key)
+                    report.writes.append(Write(bath.ip, key, start + offset, sent,
+                                               target, achieved))
+                    if achieved is not None:
+                        written[bath][key] = target
+            if offset >= self.duration:
+                return report
+            following = min(util.next_tick(n, start, self.tick, self.clock.time()), last)
+            report.skipped += following - n - 1
+            n = following
+
+
+class _MonotonicClock:
+    """Real time, from the monotonic clock."""
+
+    def time(self):
+        """Return monotonic time, in seconds."""
+        return time.monotonic()
+
+    async def sleep(self, seconds):
+        """Wait for `seconds`."""
+        await asyncio.sleep(seconds)
@@ -0,0 +1,161 @@
+"""Low-level asyncio Protocol transport for Huber baths.
+
+This is an alternative to `huber.transport.StreamTransport`, chosen with
+`Bath(ip, transport='protocol')`. Incoming bytes accumulate in one
+reusable `bytearray`, each `{SAAVVVV` frame is decoded in place with a lookup
+table, and the waiting future for that address is resolved directly, with a
+timer handle instead of a `wait_for` task per request. Replies are matched
+by echoed address, and each address counts its requests that timed out or
+were cancelled, so that many late replies are dropped rather than mistaken
+for the next request. If such a reply never comes, the next real one is
+dropped instead. The request it belonged to then times out, and as the
+count can no longer be trusted, the connection is closed to resynchronize.
+
+Distributed under the GNU General Public License v2
+Copyright (C) 2017 NuMat Technologies
+"""
+from __future__ import annotations
+
+import asyncio
+from collections import deque
+
+HEX = [-1] * 256  # byte -> hex digit value, or -1
+for _i, _c in enumerate('0123456789ABCDEF'):
+    HEX[ord(_c)] = HEX[ord(_c.lower())] = _i
+LBRACE, S, CR, LF = b'{S\r\n'
+
+
+class BathProtocol(asyncio.Protocol):
+    """Match `{S` reply frames to pending requests by address."""
+
+    def __init__(self, on_lost=None, counters=None):
+        """Set up buffers. See `huber.transport` for the arguments."""
+        self.buffer = bytearray()
+        self.pending: dict[int, deque] = {}
+        self.stale: dict[int, int] = {}
+        self.suspect: set[asyncio.Future] = set()  # waiting while a reply was dropped
+        self.transport: asyncio.Transport | None = None
+        self.on_lost = on_lost
+        self.counters = {'bytes_received': 0, 'malformed': 0} if counters is None else counters
+
+    @classmethod
+    async def connect(cls, ip, port, on_lost=None, counters=None):
+        """Open a TCP connection to a bath."""
+        loop = asyncio.get_running_loop()
+        _, protocol = await loop.create_connection(lambda: cls(on_lost, counters), ip, port)
+        return protocol
+
+    async def request(self, address, command, timeout):
+        """Send a command and return its reply's unsigned 16-bit value."""
+        future = self.expect(address, timeout)
+        self.transport.write(command)  # type: ignore
+        return await future
+
+    async def pipeline(self, addresses, command, timeout):
+        """Send several commands at once and return their reply values by address."""
+        futures = [self.expect(address, timeout) for address in addresses]
+        self.transport.write(command)  # type: ignore
+        results = await asyncio.gather(*futures, return_exceptions=True)
+        return {address: result for address, result in zip(addresses, results)
+                if isinstance(result, int)}
+
+    def close(self):
+        """Close the connection. Pending requests fail once it is lost."""
+        if self.transport is not None:
+            self.transport.close()
+
+    def connection_made(self, transport):
+        """Store the transport."""
+        self.transport = transport
+
+    def connection_lost(self, exc):
+        """Fail every pending request and notify the owner."""
+        for waiters in self.pending.values():
+            for future, timer in waiters:
+                timer.cancel()
+                if not future.done():
+                    future.set_exception(ConnectionError('Connection lost.'))
+        self.pending.clear()
+        self.stale.clear()
+        self.suspect.clear()
+        if self.on_lost is not None:
+            self.on_lost(self)
+
+    def expect(self, address, timeout):
+        """Return a future for the next reply from `address`.
+
+        The future resolves to the reply's unsigned 16-bit value, or raises
+        `asyncio.TimeoutError` after `timeout` seconds.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        timer = loop.call_later(timeout, _expire, future)
+        future.add_done_callback(lambda f: self._unanswered(address, f, timer))
+        waiters = self.pending.get(address)
+        if waiters is None:
+            waiters = self.pending[address] = deque()
+        while waiters and waiters[0][0].done():
+            waiters.popleft()  # timed out and never answered
+        waiters.append((future, timer))
+        return future
+
+    def data_received(self, data):
+        """Buffer incoming bytes and dispatch every complete line."""
+        buffer = self.buffer
+        buffer += data
+        self.counters['bytes_received'] += len(data)
+        start = 0
+        while (end := buffer.find(LF, start)) != -1:
+            self._dispatch(buffer, start, end - 1 if end and buffer[end - 1] == CR else end)
+            start = end + 1
+        if start:
+            del buffer[:start]
+
+    def _dispatch(self, buffer, start, stop):
+        """Decode the frame in `buffer[start:stop]` in place and resolve its waiter."""
+        if stop - start != 8 or buffer[start] != LBRACE or buffer[start + 1] != S:
+            self.counters['malformed'] += 1
+            return
+        a1, a0 = HEX[buffer[start + 2]], HEX[buffer[start + 3]]
+        v3, v2 = HEX[buffer[start + 4]], HEX[buffer[start + 5]]
+        v1, v0 = HEX[buffer[start + 6]], HEX[buffer[start + 7]]
+        if min(a1, a0, v3, v2, v1, v0) < 0:
+            self.counters['malformed'] += 1
+            return
+        address = a1 << 4 | a0
+        waiters = self.pending.get(address)
+        if self.stale.get(address):
+            self.stale[address] -= 1
+            if waiters:  # if that reply was lost, this one was theirs
+                self.suspect.update(future for future, _ in waiters if not future.done())
+            return  # a late reply to a request that timed out or was cancelled
+        while waiters:
+            future, timer = waiters.popleft()
+            if not future.done():
+                future.set_result(v3 << 12 | v2 << 8 | v1 << 4 | v0)
+                return
+        self.counters['malformed'] += 1  # unsolicited
+
+    def _unanswered(self, address, future, timer):
+        """Count a request that ended without a reply, so its reply is dropped.
+
+        If a reply for the address was dropped while the request waited, it
+        may have been the answer, so the connection is closed instead.
+        """
+        timer.cancel()
+        suspect = future in self.suspect
+        self.suspect.discard(future)
+        if future.cancelled() or isinstance(future.exception(), asyncio.TimeoutError):
+            if suspect and not future.cancelled():
+                self.close()
+                self.stale.clear()
+                if self.on_lost is not None:
+                    self.on_lost(self)  # don't send more requests before it's closed
+            else:
+                self.stale[address] = self.stale.get(address, 0) + 1
+
+
+def _expire(future):
+    """Time out a request that got no reply."""
+    if not future.done():
+        future.set_exception(asyncio.TimeoutError())
@@ -0,0 +1,112 @@
+"""Fixed-memory history of bath readings, stored in typed column arrays.
+
+Distributed under the GNU General Public License v2
+Copyright (C) 2017 NuMat Technologies
+"""
+from __future__ import annotations
+
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+
+from huber import codec
+
+# Array typecode for each `util.fields` format. Status and faults keep their
+# raw integers (bitfield and fault code), which decode with `codec`.
+TYPECODES = {'b': 'b', 'd': 'q', 'f': 'd', '%': 'd', 'list': 'H', 'fault': 'h'}
+
+
+class Column:
+    """Ring buffer of timestamps and typed values for a single field."""
+
+    def __init__(self, field, capacity):
+        self.field = field
+        self.capacity = capacity
+        self.time = array('d', bytes(8 * capacity))
+        self.values = array(TYPECODES[field.format], [0]) * capacity
+        self.head = 0
+        self.size = 0
+
+    def append(self, timestamp, value):
+        """Overwrite the oldest entry with a new reading."""
+        self.time[self.head] = timestamp
+        self.values[self.head] = value
+        self.head = (self.head + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+    def ordered(self):
+        """Return (time, values) arrays in chronological order."""
+        if self.size < self.capacity:
+            return self.time[:self.size], self.values[:self.size]
+        return (self.time[self.head:] + self.time[:self.head],
+                self.values[self.head:] + self.values[:self.head])
+
+
+class Recorder:
+    """Record bath readings into fixed-capacity, column-oriented ring buffers.
+
+    Attach one to a bath with `Bath(ip, recorder=Recorder())`, and every
+    reading off the wire is appended. Each field keeps `capacity` samples in
+    a float64 timestamp array and a value array typed by its format, so
+    memory is fixed and exports are bulk array copies.
+    """
+
+    def __init__(self, capacity=86400, fields=None):
+        """Allocate buffers for `fields` (period-separated keys, default all)."""
+        self.capacity = capacity
+        self.columns = {key: Column(codec.fields[key], capacity)
+                        for key in (fields or codec.fields)}
+
+    def record(self, field, number, timestamp=None):
+        """Record a raw reply integer for a `codec.Field`."""
+        column = self.columns.get(field.key)
+        if column is None or number is None:
+            return
+        column.append(time.time() if timestamp is None else timestamp,
+                      field.to_column(number))
+
+    def get(self, key, start=None, end=None):
+        """Return (time, values) arrays for a field, optionally within [start, end]."""
+        times, values = self.columns[key].ordered()
+        lo = 0 if start is None else bisect_left(times, start)
+        hi = len(times) if end is None else bisect_right(times, end)
+        return times[lo:hi], values[lo:hi]
+
+    def downsample(self, key, window, start=None, end=None):
+        """Reduce a numeric field to min/max/mean over fixed time windows.
+
+        Returns a dictionary of float64 arrays: window start time, min, max
+        and mean. Windows without samples are omitted.
+        """
+        if self.columns[key].field.format in ('list', 'fault'):
+            raise ValueError(f'Can not downsample {key}.')
+        times, values = self.get(key, start, end)
+        output = {name: array('d') for name in ('time', 'min', 'max', 'mean')}
+        i = 0
+        while i < len(times):
+            bucket = times[i] - times[i] % window
+            j = bisect_left(times, bucket + window, i)
+            chunk = values[i:j]
+            output['time'].append(bucket)
+            output['min'].append(min(chunk))
+            output['max'].append(max(chunk))
+            output['mean'].append(sum(chunk) / len(chunk))
+            i = j
+        return output
+
+    def to_numpy(self, key, start=None, end=None):
+        """Return (time, values) as numpy arrays sharing the exported buffers."""
+        import numpy as np
+        times, values = self.get(key, start, end)
+        return np.frombuffer(times, dtype=np.float64), np.frombuffer(values, dtype=values.typecode)
+
+    def to_csv(self, key, file, start=None, end=None):
+        """Write a field's samples to a path or open text file as CSV."""
+        import csv
+        if isinstance(file, str):
+            with open(file, 'w', newline='') as out_file:
+                return self.to_csv(key, out_file, start, end)
+        times, values = self.get(key, start, end)
+        writer = csv.writer(file)
+        writer.writerow(['time', key])
+        writer.writerows(zip(times, values))
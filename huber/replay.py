@@ -0,0 +1,209 @@
+"""Record wire traffic from real baths, and replay it offline.
+
+`WireLog` is a `trace` hook for `Bath` that appends every `{M`/`{S`
+exchange to a text log, one line each:
+
+    <send time> <wire seconds> <ip> <commands> <replies>
+
+with pipelined commands and replies joined by commas, and `-` for a request
+that got no reply. `ReplayBath` runs the real driver against a log in place
+of a TCP connection, and `replay` re-issues a whole log through it, at the
+recorded pace or as fast as possible, to reproduce field timing and to
+benchmark decoding and polling on realistic traffic.
+
+Distributed under the GNU General Public License v2
+Copyright (C) 2017 NuMat Technologies
+"""
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import defaultdict, deque
+from typing import NamedTuple
+
+from huber import codec
+from huber.driver import Bath
+from huber.transport import LocalTransport
+
+
+class Exchange(NamedTuple):
+    """One recorded request and its replies."""
+
+    time: float
+    wire: float
+    ip: str
+    commands: tuple[str, ...]
+    replies: tuple[str, ...]
+
+
+class WireLog:
+    """Append every exchange a `Bath` performs to a log file.
+
+        with WireLog('traffic.log') as log:
+            async with Bath('192.168.1.100', trace=log) as bath:
+                ...
+
+    The file stays open with buffered writes, so logging costs no system
+    call per request. Call `flush` to push lines to disk, and `close` (or
+    leave the `with` block) when done.
+    """
+
+    def __init__(self, path):
+        """Open `path` for appending, creating it if needed."""
+        self.path = path
+        self.file = open(path, 'a', encoding='ascii')  # noqa: SIM115, closed by close()
+
+    def __enter__(self):
+        """Provide entrance to context manager."""
+        return self
+
+    def __exit__(self, *args):
+        """Provide exit to context manager."""
+        self.close()
+
+    def __call__(self, event):
+        """Record one `Bath` trace event."""
+        response = event['response']
+        if isinstance(response, dict):
+            replies = [_line(address, reply) for address, reply in response.items()]
+        elif response is None:
+            replies = []
+        else:
+            replies = [_line(codec.fields[event['key']].address, response)]
+        commands = event['command'].decode().split()
+        self.file.write(f"{time.time() - event['wire']:.6f} {event['wire']:.6f} "
+                        f"{event['ip']} {','.join(commands)} {','.join(replies) or '-'}\n")
+
+    def flush(self):
+        """Write buffered lines to the file."""
+        self.file.flush()
+
+    def close(self):
+        """Flush and close the file."""
+        self.file.close()
+
+
+def read(path):
+    """Yield the `Exchange` on each line of a log."""
+    with open(path, encoding='ascii') as in_file:
+        for line in in_file:
+            sent, wire, ip, commands, replies = line.split()
+            yield Exchange(float(sent), float(wire), ip, tuple(commands.split(',')),
+                           () if replies == '-' else tuple(replies.split(',')))
+
+
+class ReplayBath(Bath):
+    """Run the real driver against recorded traffic instead of a TCP connection.
+
+    Each command is answered with the next recorded reply to the same
+    command, after the recorded wire time divided by `speed`, or at once if
+    `speed` is None. Commands with no recorded reply left get none, like a
+    request that timed out.
+    """
+
+    def __init__(self, exchanges, ip='replay', speed=1.0, **kwargs):
+        """Load exchanges, a list of `Exchange` or a log path, for one IP."""
+        super().__init__(ip, **kwargs)
+        self.speed = speed
+        self.replies: dict[str, deque] = defaultdict(deque)
+        if isinstance(exchanges, str):
+            exchanges = [e for e in read(exchanges) if e.ip == ip]
+        for exchange in exchanges:
+            wire = exchange.wire / len(exchange.commands)
+            replies = {reply[2:4]: reply for reply in exchange.replies}
+            for command in exchange.commands:
+                self.replies[command].append((wire, replies.get(command[2:4])))
+
+    async def _open_transport(self, on_lost):
+        """Answer from the recording instead of a TCP connection."""
+        return ReplayTransport(self, on_lost, self.metrics.counters)
+
+
+class ReplayTransport(LocalTransport):
+    """Answer commands with a `ReplayBath`'s recorded replies."""
+
+    def __init__(self, bath, on_lost=None, counters=None):
+        """Attach the bath holding the recording."""
+        super().__init__(on_lost, counters)
+        self.bath = bath
+
+    async def answer(self, commands):
+        """Pop the recorded replies to commands, waiting the recorded wire time."""
+        wire, replies = 0.0, []
+        for command in commands:
+            reply = None
+            if self.bath.replies[command]:
+                seconds, reply = self.bath.replies[command].popleft()
+                wire += seconds
+            replies.append(reply)
+        if self.bath.speed:
+            await asyncio.sleep(wire / self.bath.speed)
+        return replies
+
+
+async def replay(path, speed=1.0):
+    """Re-issue every exchange in a log through `ReplayBath`s, one per IP.
+
+    Requests start at their recorded times divided by `speed`, or
+    back-to-back if `speed` is None. Returns the baths, keyed by IP, for
+    their `metrics`.
+    """
+    exchanges = list(read(path))
+    by_ip = defaultdict(list)
+    for exchange in exchanges:
+        by_ip[exchange.ip].append(exchange)
+    baths = {ip: ReplayBath(items, ip, speed) for ip, items in by_ip.items()}
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    tasks = []
+    for exchange in exchanges:
+        if speed and exchanges:
+            delay = start + (exchange.time - exchanges[0].time) / speed - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        tasks.append(asyncio.ensure_future(_issue(baths[exchange.ip], exchange)))
+    await asyncio.gather(*tasks, return_exceptions=True)
+    return baths
+
+
+async def _issue(bath, exchange):
+    """Send one recorded exchange's commands through the driver."""
+    fields = [codec.by_address[int(command[2:4], 16)] for command in exchange.commands]
+    commands = [f'{command}\r\n'.encode() for command in exchange.commands]
+    writes = [not command.endswith('****') for command in exchange.commands]
+    if len(fields) > 1:
+        return await bath._write_and_read_many(fields, commands if any(writes) else None)
+    return await bath._write_and_read(fields[0], commands[0] if writes[0] else None)
+
+
+def _line(address, reply):
+    """Return a reply as text without its line ending, from bytes or a parsed int."""
+    if isinstance(reply, int):
+        return f'{{S{address:02X}{reply:04X}'
+    return reply.decode().strip()
+
+
+def command_line(args=None):
+    """Command-line interface to replay a wire log."""
+    import argparse
+    import json
+    parser = argparse.ArgumentParser(description="Replay recorded Huber bath "
+                                     "traffic through the driver.")
+    parser.add_argument('path', help="The wire log to replay.")
+    parser.add_argument('--speed', '-s', default=None, type=float,
+                        help="Replay speed relative to the recording. "
+                        "Defaults to as fast as possible.")
+    args = parser.parse_args(args)
+
+    async def run():
+        start = time.perf_counter()
+        baths = await replay(args.path, args.speed)
+        print(json.dumps({'duration': time.perf_counter() - start,
+                          'baths': {ip: bath.metrics.snapshot()
+                                    for ip, bath in baths.items()}}, indent=4))
+
+    asyncio.run(run())
+
+
+if __name__ == '__main__':
+    command_line()
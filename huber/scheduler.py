@@ -0,0 +1,99 @@
+"""Priority scheduling of requests sharing one bath connection.
+
+Distributed under the GNU General Public License v2
+Copyright (C) 2017 NuMat Technologies
+"""
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+
+CONTROL, ALARM, TELEMETRY = 0, 1, 2
+ALARM_FIELDS = frozenset(['status', 'error', 'warning'])
+
+
+class DeadlineExceededError(asyncio.TimeoutError):
+    """Raised when a request is still queued at its deadline."""
+
+
+class Scheduler:
+    """Mutex that grants access by priority class instead of arrival order.
+
+    Lower priorities go first (`CONTROL`, then `ALARM`, then `TELEMETRY`),
+    and requests within a class are first come, first served. Waiters that
+    were cancelled, e.g. because the caller gave up, are dropped when they
+    reach the front of the queue, and a waiter still queued at its deadline
+    fails with `DeadlineExceededError` without ever touching the wire.
+    """
+
+    def __init__(self):
+        self._busy = False
+        self._waiters: list[tuple[int, int, asyncio.Future]] = []
+        self._count = itertools.count()
+
+    def request(self, priority=TELEMETRY, deadline=None):
+        """Return an async context manager holding the connection while open.
+
+        `deadline` is the longest time, in seconds, to wait in the queue.
+        """
+        return _Request(self, priority, deadline)
+
+    def locked(self):
+        """Return True if a request currently holds the connection."""
+        return self._busy
+
+    def pending(self):
+        """Return the number of live queued requests."""
+        return sum(not future.done() for _, _, future in self._waiters)
+
+    async def acquire(self, priority=TELEMETRY, deadline=None):
+        """Wait for the connection, by priority, for at most `deadline` seconds."""
+        if not self._busy:
+            self._busy = True
+            return
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        heapq.heappush(self._waiters, (priority, next(self._count), future))
+        timer = None if deadline is None else loop.call_later(deadline, _expire, future)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled() and future.exception() is None:
+                self.release()  # granted just as the caller gave up; pass it on
+            raise
+        finally:
+            if timer is not None:
+                timer.cancel()
+
+    def release(self):
+        """Hand the connection to the highest-priority live waiter."""
+        while self._waiters:
+            future = heapq.heappop(self._waiters)[2]
+            if not future.done():
+                future.set_result(None)
+                return
+        self._busy = False
+
+
+class _Request:
+    """Async context manager for a single scheduled request."""
+
+    __slots__ = ('deadline', 'priority', 'scheduler')
+
+    def __init__(self, scheduler, priority, deadline):
+        self.scheduler = scheduler
+        self.priority = priority
+        self.deadline = deadline
+
+    async def __aenter__(self):
+        await self.scheduler.acquire(self.priority, self.deadline)
+
+    async def __aexit__(self, *args):
+        self.scheduler.release()
+
+
+def _expire(future):
+    """Fail a queued request that reached its deadline."""
+    if not future.done():
+        future.set_exception(DeadlineExceededError('Request deadline exceeded in queue.'))
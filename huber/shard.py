@@ -0,0 +1,233 @@
+"""Poll very large fleets from several processes into shared memory.
+
+One event loop parsing replies for thousands of baths is bound to a single
+core. `ShardedPoller` splits the baths across worker processes, each polling
+its share with a `BathFleet`, and publishes the latest readings into a
+`Table` in shared memory: one row per bath and one typed column per field.
+The parent reads rows, or copies whole columns, straight from the shared
+buffer without going through the workers.
+
+Distributed under the GNU General Public License v2
+Copyright (C) 2017 NuMat Technologies
+"""
+from __future__ import annotations
+
+import asyncio
+import time
+from array import array
+from typing import Any
+
+from huber import codec, util
+from huber.recorder import TYPECODES
+
+SPINS = 100000  # attempts to read a row that is being written
+
+
+class Table:
+    """Latest reading of every field for a fixed list of baths, in shared memory.
+
+    Each row has a sequence number, a timestamp and a bitmask of the fields
+    present, followed by one array per field typed as in `huber.recorder`.
+    Writers bump the sequence number before and after updating a row, and
+    readers retry while it is odd or changes, so a row is always read whole.
+    """
+
+    def __init__(self, ips, name=None):
+        """Create a table for `ips`, or attach to an existing one by `name`."""
+        from multiprocessing import shared_memory
+        self.ips = list(ips)
+        self.rows = {ip: row for row, ip in enumerate(self.ips)}
+        self.fields = list(codec.fields.values())
+        self.bits = {field.key: 1 << i for i, field in enumerate(self.fields)}
+        layout = [('seq', 'Q'), ('time', 'd'), ('mask', 'Q')]
+        layout += [(field.key, TYPECODES[field.format]) for field in self.fields]
+        size = sum(_stride(typecode, len(self.ips)) for _, typecode in layout)
+        self.shm = shared_memory.SharedMemory(name, create=name is None, size=size)
+        self.name = self.shm.name
+        self.columns: dict[str, Any] = {}
+        buffer: Any = self.shm.buf
+        offset = 0
+        for key, typecode in layout:
+            stride = _stride(typecode, len(self.ips))
+            self.columns[key] = buffer[offset:offset + stride].cast(typecode)
+            offset += stride
+
+    def __getitem__(self, ip):
+        """Return the latest row for a bath. See `read`."""
+        return self.read(self.rows[ip])
+
+    def write(self, row, values, timestamp=None):
+        """Replace a row with `{codec.Field: raw reply integer}`."""
+        columns = self.columns
+        mask = 0
+        columns['seq'][row] += 1
+        for field, number in values.items():
+            columns[field.key][row] = field.to_column(number)
+            mask |= self.bits[field.key]
+        columns['mask'][row] = mask
+        columns['time'][row] = time.time() if timestamp is None else timestamp
+        columns['seq'][row] += 1
+
+    def read(self, row):
+        """Return `{'time': ..., 'values': {key: value}}` for a row.
+
+        Returns None if the row was never written, or if it stays mid-write
+        for `SPINS` attempts, as when a worker was killed while writing it.
+        """
+        columns = self.columns
+        for _ in range(SPINS):
+            seq = columns['seq'][row]
+            if seq % 2:
+                continue
+            timestamp, mask = columns['time'][row], columns['mask'][row]
+            raw = [(field, columns[field.key][row]) for i, field in enumerate(self.fields)
+                   if mask >> i & 1]
+            if columns['seq'][row] == seq:
+                break
+        else:
+            return None
+        if not seq:
+            return None
+        values = {}
+        for field, number in raw:
+            if field.format in ('list', 'fault'):
+                number = field.decoder(number)
+            elif field.format == 'b':
+                number = bool(number)
+            values[field.key] = number
+        return {'time': timestamp, 'values': values}
+
+    def column(self, key):
+        """Return a copy of a field's values for every row, as an `array`.
+
+        The copy is a single bulk read of the shared buffer, and stays valid
+        after the table is closed.
+        """
+        view = self.columns[key]
+        return array(view.format, view[:len(self.ips)].tobytes())
+
+    def snapshot(self):
+        """Return every row, keyed by IP."""
+        return {ip: self.read(row) for ip, row in self.rows.items()}
+
+    def close(self):
+        """Detach from the shared memory."""
+        for column in self.columns.values():
+            column.release()
+        self.columns.clear()
+        self.shm.close()
+
+    def unlink(self):
+        """Free the shared memory. Call once, from the creating process."""
+        self.shm.unlink()
+
+
+class ShardedPoller:
+    """Poll baths from several worker processes into a shared `Table`.
+
+        with ShardedPoller(ips, processes=8, interval=1) as poller:
+            time.sleep(2)
+            print(poller.get())               # {ip: {'time', 'values'} or None}
+            speeds = poller.table.column('pump.speed')
+
+    Baths are dealt round-robin across `processes` (default: one per core).
+    Extra arguments are passed to each worker's `BathFleet`.
+    """
+
+    def __init__(self, ips, processes=None, interval=1.0, **kwargs):
+        """Allocate the table. Call `start`, or use as a context manager."""
+        import multiprocessing
+        import os
+        self.context = multiprocessing.get_context('spawn')
+        self.table = Table(ips)
+        self.processes = min(processes or os.cpu_count() or 1, max(len(self.table.ips), 1))
+        self.interval = interval
+        self.kwargs = kwargs
+        self.workers: list = []
+        self._stop = self.context.Event()
+
+    def __enter__(self):
+        """Start polling."""
+        self.start()
+        return self
+
+    def __exit__(self, *args):
+        """Stop polling and free the table."""
+        self.stop()
+
+    def start(self):
+        """Start the worker processes."""
+        ips = self.table.ips
+        for shard in range(self.processes):
+            rows = list(range(shard, len(ips), self.processes))
+            worker = self.context.Process(
+                target=_work, daemon=True, name=f'huber-shard-{shard}',
+                args=(self.table.name, ips, rows, self.interval, self.kwargs, self._stop))
+            worker.start()
+            self.workers.append(worker)
+
+    def stop(self, timeout=5.0):
+        """Stop the workers, then free the table."""
+        self._stop.set()
+        for worker in self.workers:
+            worker.join(timeout)
+            if worker.is_alive():
+                worker.terminate()
+        self.workers.clear()
+        try:
+            self.table.close()
+        finally:
+            self.table.unlink()
+
+    def get(self):
+        """Return the latest reading of every bath, keyed by IP."""
+        return self.table.snapshot()
+
+
+class _RowWriter:
+    """Collect one bath's raw readings through the `Bath.recorder` hook."""
+
+    def __init__(self):
+        self.values: dict = {}
+
+    def record(self, field, number, timestamp=None):
+        """Hold a raw reply integer until the cycle is committed."""
+        if number is not None:
+            self.values[field] = number
+
+
+def _work(name, ips, rows, interval, kwargs, stop):
+    """Run one shard's poll loop in a worker process."""
+    table = Table(ips, name)
+    try:
+        asyncio.run(_poll(table, rows, interval, kwargs, stop))
+    finally:
+        table.close()
+
+
+async def _poll(table, rows, interval, kwargs, stop):
+    """Poll a shard every `interval` seconds, committing each bath's row."""
+    from huber.fleet import BathFleet
+    ips = [table.ips[row] for row in rows]
+    fleet = BathFleet(ips, **kwargs)
+    writers = {}
+    for ip, bath in fleet.baths.items():
+        bath.recorder = writers[ip] = _RowWriter()
+    loop = asyncio.get_running_loop()
+    start, tick = loop.time(), 0
+    try:
+        while not stop.is_set():
+            await fleet.get(flat=True)
+            for row, ip in zip(rows, ips):
+                if writers[ip].values:
+                    table.write(row, writers[ip].values)
+                    writers[ip].values = {}
+            tick = util.next_tick(tick, start, interval, loop.time())
+            await asyncio.sleep(start + tick * interval - loop.time())
+    finally:
+        fleet.close()
+
+
+def _stride(typecode, count):
+    """Return the bytes for a column of `count` items, padded to 8 bytes."""
+    return -(-array(typecode).itemsize * max(count, 1) // 8) * 8
@@ -0,0 +1,196 @@
+"""Local TCP simulator speaking Huber's PB protocol.
+
+Unlike `huber.mock`, this exercises the real driver end to end: the
+connection handling, command encoding, reply parsing and reconnect logic.
+It answers `{M` commands for every address in `util.fields` and replies
+`7FFF` to anything else, with knobs for latency, jitter, dropped replies and
+disconnects so the driver can be load-tested against many fake baths.
+
+Distributed under the GNU General Public License v2
+Copyright (C) 2017 NuMat Technologies
+"""
+from __future__ import annotations
+
+import asyncio
+import random
+
+from huber import codec, util
+
+
+class Server:
+    """Simulate a single Huber bath on a local TCP port."""
+
+    def __init__(self, host='127.0.0.1', port=8101, latency=0.0, jitter=0.0,
+                 drop_rate=0.0, disconnect_rate=0.0, unsupported=(), pipelining=True,
+                 seed=None):
+        """Configure the simulated bath.
+
+        Each reply is sent `latency` seconds, plus up to `jitter`, after its
+        command arrives, like a network round trip, so pipelined commands
+        overlap while replies keep their order. `drop_rate` and
+        `disconnect_rate` are probabilities per command. Keys listed in
+        `unsupported` answer `7FFF`, like models missing that feature. With
+        `pipelining` off, only the first command of each received packet is
+        answered, like controllers that handle one command in flight.
+        """
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.jitter = jitter
+        self.drop_rate = drop_rate
+        self.disconnect_rate = disconnect_rate
+        self.pipelining = pipelining
+        self.random = random.Random(seed)
+        self.registers = {
+            0x00: 2000,   # temperature.setpoint, 20.00 C
+            0x01: 2349,   # temperature.bath, 23.49 C
+            0x03: 0,      # pump.pressure
+            0x05: 0,      # error
+            0x06: 0,      # warning
+            0x07: 2271,   # temperature.process, 22.71 C
+            0x0a: 0,      # status
+            0x0f: 800,    # fill, 0.800
+            0x14: 0,      # on
+            0x26: 0,      # pump.speed
+            0x48: 2000,   # pump.setpoint
+            0x5c: 338,    # maintenance
+        }
+        self.unsupported = {codec.fields[key].address for key in unsupported}
+        self.commands = 0
+        self.packets = 0
+        self.connections = 0
+        self._server: asyncio.AbstractServer | None = None
+        self._clients: set[asyncio.StreamWriter] = set()
+
+    async def __aenter__(self):
+        """Start serving on entrance to the async context manager."""
+        await self.start()
+        return self
+
+    async def __aexit__(self, *args):
+        """Stop serving on exit from the async context manager."""
+        await self.stop()
+
+    async def start(self):
+        """Start listening. With `port=0`, the chosen port is stored on `port`."""
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        """Stop listening and close every client connection."""
+        server, self._server = self._server, None
+        if server is not None:
+            server.close()
+        clients, self._clients = self._clients, set()
+        for writer in clients:
+            writer.close()
+        await asyncio.gather(*(writer.wait_closed() for writer in clients),
+                             return_exceptions=True)
+        if server is not None:
+            await server.wait_closed()
+
+    def set(self, key, value):
+        """Set the value, in engineering units, reported for a field key."""
+        field = codec.fields[key]
+        self.registers[field.address] = int(100 * value if field.format == 'f' else
+                                            1000 * value if field.format == '%' else value)
+
+    def respond(self, command):
+        """Return the reply to a single `{M` command, without line ending."""
+        address = int(command[2:4], 16)
+        if address in self.unsupported or address not in self.registers:
+            return f'{{S{address:02X}7FFF'
+        if command[4:8] != '****':
+            self.registers[address] = util.hex_to_int(command[4:8])
+            if address == 0x14:
+                status = 0b10011 if self.registers[address] else 0
+                self.registers[0x0a] = (self.registers[0x0a] & ~0b10011) | status
+            elif address in (0x05, 0x06):
+                self.registers[address] = 0
+        return f'{{S{address:02X}{util.int_to_hex(self.registers[address])}'
+
+    async def _handle(self, reader, writer):
+        """Serve one client connection until it closes."""
+        self.connections += 1
+        self._clients.add(writer)
+        loop = asyncio.get_running_loop()
+        buffer, due = b'', 0.0
+        try:
+            while data := await reader.read(4096):
+                self.packets += 1
+                *lines, buffer = (buffer + data).split(b'\r\n')
+                for line in lines if self.pipelining else lines[:1]:
+                    self.commands += 1
+                    if self.random.random() < self.disconnect_rate:
+                        return
+                    if self.random.random() < self.drop_rate:
+                        continue
+                    try:
+                        reply = self.respond(line.decode().strip())
+                    except (ValueError, IndexError):
+                        continue  # real controllers ignore garbage
+                    delay = self.latency + self.jitter * self.random.random()
+                    due = max(loop.time() + delay, due)
+                    loop.call_at(due, _send, writer, f'{reply}\r\n'.encode())
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self._clients.discard(writer)
+            writer.close()
+
+
+def _send(writer, reply):
+    """Write a delayed reply, unless the connection has closed since."""
+    if not writer.is_closing():
+        writer.write(reply)
+
+
+class Farm:
+    """Run many simulated baths, one per loopback port."""
+
+    def __init__(self, count, host='127.0.0.1', **kwargs):
+        """Create `count` simulators. Extra arguments are passed to `Server`."""
+        self.servers = [Server(host=host, port=0, **kwargs) for _ in range(count)]
+
+    @property
+    def addresses(self):
+        """Return the 'host:port' of every simulator, as accepted by `BathFleet`."""
+        return [f'{server.host}:{server.port}' for server in self.servers]
+
+    async def __aenter__(self):
+        """Start all simulators."""
+        await asyncio.gather(*(server.start() for server in self.servers))
+        return self
+
+    async def __aexit__(self, *args):
+        """Stop all simulators."""
+        await asyncio.gather(*(server.stop() for server in self.servers))
+
+
+def command_line(args=None):
+    """Run a simulated bath from the command line."""
+    import argparse
+    parser = argparse.ArgumentParser(description="Simulate a Huber bath on a TCP port.")
+    parser.add_argument('--host', default='127.0.0.1', help="Interface to bind.")
+    parser.add_argument('--port', default=8101, type=int, help="Port to listen on.")
+    parser.add_argument('--latency', default=0.0, type=float,
+                        help="Delay from each command to its reply, in seconds.")
+    parser.add_argument('--jitter', default=0.0, type=float,
+                        help="Random extra reply delay, in seconds.")
+    parser.add_argument('--drop-rate', default=0.0, type=float,
+                        help="Probability of silently dropping a reply.")
+    parser.add_argument('--disconnect-rate', default=0.0, type=float,
+                        help="Probability of closing the connection per command.")
+    args = parser.parse_args(args)
+
+    async def serve():
+        async with Server(args.host, args.port, args.latency, args.jitter,
+                          args.drop_rate, args.disconnect_rate):
+            await asyncio.Event().wait()
+
+    asyncio.run(serve())
+
+
+if __name__ == '__main__':
+    command_line()
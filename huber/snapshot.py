@@ -0,0 +1,101 @@
+"""Compact, typed bath readings.
+
+`Bath.get()` builds a fresh tree of dictionaries for every sample.
+`Bath.get_snapshot()` returns a `Snapshot` instead: a single object with one
+slot per field in `util.fields`, where the status stays an integer bitfield
+and faults stay integer codes until they're looked at. `to_dict()` gives back
+the same structure as `Bath.get()`.
+
+Distributed under the GNU General Public License v2
+Copyright (C) 2017 NuMat Technologies
+"""
+from __future__ import annotations
+
+from huber import codec, util
+
+# Attribute name, and (parent, leaf) path in `to_dict` output, for each key.
+ATTRIBUTES = {key: key.replace('.', '_') for key in codec.fields}
+_PATHS = [(ATTRIBUTES[key], *key.rpartition('.')[::2]) for key in codec.fields]
+
+
+class Status(int):
+    """Status bitfield. Flags are decoded on access, e.g. `status.pumping`."""
+
+    __slots__ = ()
+
+    def to_dict(self):
+        """Return the flags as a dictionary, as in `Bath.get_status()`."""
+        return codec.fields['status'].decoder(self)
+
+
+def _flag(bit):
+    """Return a property reading one bit of a `Status`."""
+    return property(lambda self: bool(self >> bit & 1), doc=f'Bit {bit} of the status.')
+
+
+for _bit, _name in util.fields['status']['list'].items():  # type: ignore
+    setattr(Status, _name, _flag(_bit))
+
+
+class Snapshot:
+    """One reading of a bath, with an attribute per field.
+
+    Attributes are named after period-separated keys with underscores, e.g.
+    `temperature_bath`, and are None for fields that weren't read. `status`
+    is a `Status`, and `error` and `warning` hold raw fault codes, which
+    `to_dict` looks up in `faults.csv`.
+    """
+
+    __slots__ = ('time', *ATTRIBUTES.values())
+
+    def __init__(self, time=None, **values):
+        """Create a snapshot from attribute values."""
+        self.time = time
+        for name in ATTRIBUTES.values():
+            setattr(self, name, values.pop(name, None))
+        if values:
+            raise TypeError(f'Unknown fields {sorted(values)}.')
+
+    @classmethod
+    def from_raw(cls, numbers, time=None):
+        """Build a snapshot from `{key: raw reply integer}`."""
+        snapshot = cls(time)
+        for key, number in numbers.items():
+            field = codec.fields[key]
+            if field.format == 'list':
+                value = Status(number & 0xFFFF)
+            elif field.format == 'fault':
+                value = number
+            else:
+                value = field.decode(number)
+            setattr(snapshot, ATTRIBUTES[key], value)
+        return snapshot
+
+    def __eq__(self, other):
+        """Compare every field."""
+        if not isinstance(other, Snapshot):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    def __repr__(self):
+        """Show the fields that were read."""
+        values = ', '.join(f'{name}={getattr(self, name)!r}' for name in self.__slots__
+                           if getattr(self, name) is not None)
+        return f'Snapshot({values})'
+
+    def to_dict(self, flat=False):
+        """Return the fields that were read, shaped like the output of `Bath.get()`."""
+        output: dict = {}
+        for name, parent, leaf in _PATHS:
+            value = getattr(self, name)
+            if value is None:
+                continue
+            if name in ('status', 'error', 'warning'):
+                value = codec.fields[name].decoder(value)
+            if flat:
+                output[f'{parent}.{leaf}' if parent else leaf] = value
+            elif parent:
+                output.setdefault(parent, {})[leaf] = value
+            else:
+                output[leaf] = value
+        return output
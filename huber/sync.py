@@ -0,0 +1,124 @@
+"""Synchronous, thread-safe access to Huber baths.
+
+`SyncBath` and `SyncFleet` wrap `Bath` and `BathFleet` for threaded code.
+Every instance shares one background thread running an event loop, which
+owns the connections, so calls from any thread reuse a persistent connection
+instead of paying for a new loop and TCP handshake per call.
+
+Distributed under the GNU General Public License v2
+Copyright (C) 2017 NuMat Technologies
+"""
+from __future__ import annotations
+
+import asyncio
+import inspect
+import threading
+
+from huber.driver import Bath
+from huber.fleet import BathFleet
+
+_loop: asyncio.AbstractEventLoop | None = None
+_lock = threading.Lock()
+
+
+def get_loop():
+    """Return the shared background event loop, starting its thread if needed."""
+    global _loop
+    with _lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name='huber-loop',
+                             daemon=True).start()
+        return _loop
+
+
+def run(coroutine, timeout=None):
+    """Run a coroutine on the background loop and wait for its result.
+
+    On timeout the coroutine is cancelled and `concurrent.futures.TimeoutError`
+    is raised.
+    """
+    future = asyncio.run_coroutine_threadsafe(coroutine, get_loop())
+    try:
+        return future.result(timeout)
+    except BaseException:
+        future.cancel()
+        raise
+
+
+async def _call(function, *args, **kwargs):
+    """Call a function on the loop thread. Used for constructors and `close`."""
+    return function(*args, **kwargs)
+
+
+class _Proxy:
+    """Forward method calls to an async object living on the background loop."""
+
+    def __init__(self, cls, *args, timeout=5.0, **kwargs):
+        self.timeout = timeout
+        self._target = run(_call(cls, *args, **kwargs))
+
+    def __enter__(self):
+        """Provide entrance to context manager."""
+        return self
+
+    def __exit__(self, *args):
+        """Provide exit to context manager."""
+        self.close()
+
+    def __getattr__(self, name):
+        """Wrap coroutine methods so they block until done or timed out."""
+        attribute = getattr(self._target, name)
+        if not inspect.iscoroutinefunction(attribute):
+            return attribute
+
+        def method(*args, timeout=None, **kwargs):
+            timeout = self.timeout if timeout is None else timeout
+            return run(attribute(*args, **kwargs), timeout)
+        method.__doc__ = attribute.__doc__
+        return method
+
+    def close(self):
+        """Close the connections. They are reopened on the next call."""
+        run(_call(self._target.close), self.timeout)
+
+
+class SyncBath(_Proxy):
+    """Blocking interface to a `Bath`, safe to share between threads.
+
+    Every coroutine method of `Bath` is available as a blocking method with
+    an extra `timeout` argument, in seconds, defaulting to `timeout`.
+
+        with SyncBath('192.168.1.100') as bath:
+            bath.set_setpoint(50)
+            print(bath.get())
+    """
+
+    def __init__(self, ip, timeout=5.0, **kwargs):
+        """Create a `Bath` on the background loop. Extra arguments go to `Bath`."""
+        super().__init__(Bath, ip, timeout=timeout, **kwargs)
+
+    def subscribe(self, *args, timeout=None, **kwargs):
+        """Iterate over `Bath.subscribe` samples, waiting up to `timeout` for each."""
+        timeout = self.timeout if timeout is None else timeout
+        samples = self._target.subscribe(*args, **kwargs)
+        try:
+            while True:
+                try:
+                    yield run(samples.__anext__(), timeout)
+                except StopAsyncIteration:
+                    return
+        finally:
+            run(samples.aclose(), self.timeout)
+
+
+class SyncFleet(_Proxy):
+    """Blocking interface to a `BathFleet`, safe to share between threads."""
+
+    def __init__(self, ips, timeout=None, **kwargs):
+        """Create a `BathFleet` on the background loop.
+
+        Extra arguments go to `BathFleet`. As the fleet already gives each
+        bath a deadline, `timeout` defaults to no limit.
+        """
+        super().__init__(BathFleet, ips, timeout=timeout, **kwargs)
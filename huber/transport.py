@@ -0,0 +1,118 @@
+"""I/O layers carrying commands between the driver and a bath.
+
+A transport is opened with `connect(ip, port, on_lost, counters)` and
+offers `request(address, command, timeout)`, returning the reply or raising
+`asyncio.TimeoutError` or `OSError`, and `pipeline(addresses, command,
+timeout)`, returning the replies that arrived, keyed by address. It calls
+`on_lost(transport)` once closed, and counts `bytes_received` into
+`counters`, a `Metrics.counters` dict.
+
+Distributed under the GNU General Public License v2
+Copyright (C) 2017 NuMat Technologies
+"""
+from __future__ import annotations
+
+import asyncio
+from typing import Any
+
+from huber import codec
+from huber.protocol import BathProtocol
+
+
+class StreamTransport:
+    """Send commands over asyncio streams, reading replies line by line.
+
+    Replies are matched to requests by order, so the connection is closed
+    whenever a request ends without its reply, rather than letting a late
+    reply answer the next request. The driver reconnects on the next one.
+    """
+
+    def __init__(self, reader, writer, on_lost=None, counters=None):
+        """Wrap an open stream pair."""
+        self.reader = reader
+        self.writer = writer
+        self.on_lost = on_lost
+        self.counters = {'bytes_received': 0} if counters is None else counters
+
+    @classmethod
+    async def connect(cls, ip, port, on_lost=None, counters=None):
+        """Open a TCP connection to a bath."""
+        reader, writer = await asyncio.open_connection(ip, port)
+        return cls(reader, writer, on_lost, counters)
+
+    async def request(self, address, command, timeout):
+        """Send a command and return its reply line."""
+        try:
+            self.writer.write(command)
+            line = await asyncio.wait_for(self.reader.readuntil(b'\r\n'), timeout)
+        except (asyncio.CancelledError, asyncio.TimeoutError, OSError):
+            self.close()
+            raise
+        except asyncio.IncompleteReadError as e:
+            self.close()
+            raise ConnectionError(f'Connection closed with {e.partial!r} unread.') from e
+        self.counters['bytes_received'] += len(line)
+        return line
+
+    async def pipeline(self, addresses, command, timeout):
+        """Send several commands at once and return their reply lines by address."""
+        replies: dict = {}
+        try:
+            self.writer.write(command)
+            while len(replies) < len(addresses):
+                line = await asyncio.wait_for(self.reader.readuntil(b'\r\n'), timeout)
+                self.counters['bytes_received'] += len(line)
+                replies[codec.reply_address(line)] = line
+        except asyncio.CancelledError:
+            self.close()
+            raise
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, OSError):
+            self.close()
+        return replies
+
+    def close(self):
+        """Close the connection."""
+        self.writer.close()
+        if self.on_lost is not None:
+            self.on_lost(self)
+
+
+class LocalTransport:
+    """Answer commands in process instead of over TCP.
+
+    Subclasses implement `answer`, as `huber.mock` does with a physical
+    model and `huber.replay` with recorded traffic. Everything above this
+    layer is the real driver. Commands without an answer time out at once.
+    """
+
+    def __init__(self, on_lost=None, counters=None):
+        """Set up counters. See the module docstring for the arguments."""
+        self.on_lost = on_lost
+        self.counters = {'bytes_received': 0} if counters is None else counters
+
+    async def answer(self, commands):
+        """Return a reply string, or None, for each command string."""
+        raise NotImplementedError
+
+    async def request(self, address, command, timeout):
+        """Answer a command, returning its reply line."""
+        reply = (await self.answer([command.decode().strip()]))[0]
+        if reply is None:
+            raise asyncio.TimeoutError
+        self.counters['bytes_received'] += len(reply) + 2
+        return f'{reply}\r\n'.encode()
+
+    async def pipeline(self, addresses, command, timeout):
+        """Answer several commands, returning the reply lines by address."""
+        answers = await self.answer(command.decode().split())
+        replies = [f'{reply}\r\n'.encode() for reply in answers if reply is not None]
+        self.counters['bytes_received'] += sum(len(reply) for reply in replies)
+        return {codec.reply_address(reply): reply for reply in replies}
+
+    def close(self):
+        """Mark the transport closed."""
+        if self.on_lost is not None:
+            self.on_lost(self)
+
+
+TRANSPORTS: dict[str, Any] = {'stream': StreamTransport, 'protocol': BathProtocol}
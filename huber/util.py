@@ -1,17 +1,39 @@
-"""Utilities to handle Huber's encodings."""
-import csv
+"""Utilities to handle Huber's encodings, and scheduling helpers."""
 import os
 
 root = os.path.normpath(os.path.dirname(__file__))
-with open(os.path.join(root, 'faults.csv'), encoding='utf8') as in_file:
-    reader = csv.reader(in_file)
-    next(reader)
-    faults = {int(row[0]): {
-        'code': int(row[0]),
-        'type': row[1],
-        'condition': row[2] if len(row) >= 3 else None,
-        'recovery': row[3] if len(row) == 4 else None
-    } for row in reader if row[0]}
+
+
+def load_faults():
+    """Parse the fault table from `faults.csv`, keyed by fault code."""
+    import csv
+    with open(os.path.join(root, 'faults.csv'), encoding='utf8') as in_file:
+        reader = csv.reader(in_file)
+        next(reader)
+        return {int(row[0]): {
+            'code': int(row[0]),
+            'type': row[1],
+            'condition': row[2] if len(row) >= 3 else None,
+            'recovery': row[3] if len(row) == 4 else None
+        } for row in reader if row[0]}
+
+
+_faults = None
+
+
+def get_faults():
+    """Return the fault table, loading it on first use."""
+    global _faults
+    if _faults is None:
+        _faults = load_faults()
+    return _faults
+
+
+def __getattr__(name):
+    """Provide `faults` lazily, keeping file I/O out of import."""
+    if name == 'faults':
+        return get_faults()
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
 
 fields = {
     'on': {
@@ -129,14 +151,14 @@ def parse(number, settings):
     elif format == 'list':
         return {v: bool(number >> i & 1) for i, v in settings['list'].items()}
     elif format == 'fault':
-        return faults[number] if number < 0 else None
+        return get_faults()[number] if number < 0 else None
     else:
         raise NotImplementedError(f'Number format "{format}" not supported.')
 
 
-def get_field(key):
-    """Search period-separated key searching on `fields`."""
-    f = fields
+def get_field(key, tree=None):
+    """Search period-separated key searching on `fields`, or another tree."""
+    f = fields if tree is None else tree
     for k in key.split('.'):
         f = f[k]  # type: ignore
     return f
@@ -152,3 +174,20 @@ def set_nested(dictionary, keys, value):
             d[node] = {}
         d = d[node]
     d[leaf] = value
+
+
+def next_tick(tick, start, interval, now):
+    """Return the number of the next tick that isn't already past.
+
+    Ticks fall at `start + n * interval`, so lateness doesn't accumulate.
+    Skips ticks that passed while the current one ran, so a slow cycle is
+    followed by the next tick on schedule instead of a burst.
+    """
+    return max(tick + 1, int((now - start) / interval) + 1)
+
+
+def offer(queue, item):
+    """Put an item on a bounded `asyncio.Queue`, dropping its oldest if full."""
+    if queue.full():
+        queue.get_nowait()
+    queue.put_nowait(item)
@@ -18,7 +18,10 @@ setup(
     packages=['huber'],
     package_data={'huber': ['faults.csv']},
     entry_points={
-        'console_scripts': [('huber = huber:command_line')]
+        'console_scripts': [
+            'huber = huber:command_line',
+            'huber-gateway = huber.gateway:command_line',
+        ]
     },
     extras_require={
         'test': [
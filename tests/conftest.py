@@ -0,0 +1,11 @@
+"""Shared fixtures for the Huber driver tests."""
+import pytest_asyncio
+
+from huber.simulator import Server
+
+
+@pytest_asyncio.fixture
+async def simulator():
+    """Run a simulated bath on a free loopback port."""
+    async with Server(port=0) as server:
+        yield server
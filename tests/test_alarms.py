@@ -0,0 +1,115 @@
+"""Test the alarm engine."""
+import asyncio
+
+import pytest
+
+from huber.alarms import AlarmEngine, Deviation, Threshold
+from huber.driver import Bath as RealBath
+from huber.mock import SimulatedBath, Thermostat, VirtualClock
+
+
+@pytest.mark.asyncio
+async def test_faults_read_on_rising_edge():
+    """Confirm fault details are read once per rising edge of a status bit."""
+    model = Thermostat(VirtualClock(speed=0), noise=0)
+    bath = SimulatedBath(model=model)
+    engine = AlarmEngine(bath)
+    events = []
+    engine.on(events.append)
+    model.inject(-1025)
+    for t in range(5):
+        await engine.update(await bath.get(engine.keys, flat=True), t)
+    await asyncio.sleep(0)
+    assert [(e.name, e.active, e.detail['code']) for e in events] == [('error', True, -1025)]
+    assert bath.metrics.counters['requests'] == 6
+    await bath.clear_error()
+    await engine.update(await bath.get(engine.keys, flat=True), 5)
+    await asyncio.sleep(0)
+    assert [(e.name, e.active) for e in events][-1] == ('error', False)
+    assert not engine.active
+
+
+@pytest.mark.asyncio
+async def test_threshold_rules():
+    """Confirm rules raise and clear with hysteresis, and async callbacks run."""
+    engine = AlarmEngine(None, [Threshold('fill low', 'fill', low=0.2, hysteresis=0.05),
+                                Deviation('off target', limit=2.0)])
+    events = []
+
+    async def record(alarm):
+        events.append((alarm.name, alarm.active))
+    engine.on(record)
+    values = {'fill': 0.5, 'temperature.bath': 20.0, 'temperature.setpoint': 20.0}
+    for t, update in enumerate([{}, {'fill': 0.1}, {'fill': 0.22},
+                                {'fill': 0.3, 'temperature.bath': 25.0}]):
+        values.update(update)
+        await engine.update(dict(values), t)
+    await asyncio.sleep(0)
+    assert events == [('fill low', True), ('fill low', False), ('off target', True)]
+    assert set(engine.active) == {'off target'}
+
+
+@pytest.mark.asyncio
+async def test_run_and_events():
+    """Confirm the engine polls on its own and streams events."""
+    model = Thermostat(VirtualClock(speed=0))
+    engine = AlarmEngine(SimulatedBath(model=model), [Deviation('off target')],
+                         interval=0.01)
+    model.setpoint = 50
+    events = engine.events()
+    task = asyncio.ensure_future(engine.run())
+    alarm = await asyncio.wait_for(events.__anext__(), 1)
+    task.cancel()
+    assert alarm.name == 'off target' and alarm.active
+
+
+@pytest.mark.asyncio
+async def test_missing_values_keep_rule_state():
+    """Confirm a timed-out read doesn't break or clear threshold rules."""
+    engine = AlarmEngine(None, [Threshold('fill low', 'fill', low=0.2)])
+    await engine.update({'fill': 0.1}, 0)
+    await engine.update({'fill': None}, 1)
+    assert set(engine.active) == {'fill low'}
+
+
+@pytest.mark.asyncio
+async def test_run_survives_unavailable_bath(simulator):
+    """Confirm polling failures raise a communication alarm instead of stopping."""
+    bath = RealBath('127.0.0.1', port=simulator.port, backoff=0.01, max_backoff=0.01,
+                    comm_timeout=0.05)
+    engine = AlarmEngine(bath, [Threshold('fill low', 'fill', low=0.2)], interval=0.02)
+    events = engine.events()
+    await simulator.stop()
+    task = asyncio.ensure_future(engine.run())
+    alarm = await asyncio.wait_for(events.__anext__(), 1)
+    assert alarm.name == 'communication' and alarm.active
+    simulator.drop_rate = 1
+    await simulator.start()
+    await asyncio.sleep(0.2)
+    simulator.drop_rate = 0
+    alarm = await asyncio.wait_for(events.__anext__(), 1)
+    assert alarm.name == 'communication' and not alarm.active
+    assert not task.done()
+    task.cancel()
+    bath.close()
+
+
+@pytest.mark.asyncio
+async def test_run_survives_undecodable_readings(simulator):
+    """Confirm out-of-range readings and unknown fault codes don't stop the engine."""
+    bath = RealBath('127.0.0.1', port=simulator.port)
+    engine = AlarmEngine(bath, [Threshold('fill low', 'fill', low=0.2)], interval=0.02)
+    events = engine.events()
+    simulator.set('fill', 1.5)
+    task = asyncio.ensure_future(engine.run())
+    alarm = await asyncio.wait_for(events.__anext__(), 1)
+    assert alarm.name == 'communication' and isinstance(alarm.detail, ValueError)
+    simulator.set('fill', 0.8)
+    simulator.registers[0x05] = -3  # not in faults.csv
+    simulator.registers[0x0a] = 1 << 8
+    alarms = [await asyncio.wait_for(events.__anext__(), 1) for _ in range(2)]
+    assert {(a.name, a.active, a.detail) for a in alarms} == {
+        ('communication', False, None), ('error', True, None)}
+    assert not task.done()
+    task.cancel()
+    bath.close()
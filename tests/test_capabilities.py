@@ -0,0 +1,45 @@
+"""Test discovery and persistence of per-bath field support."""
+import json
+
+import pytest
+
+from huber import Bath
+from huber.simulator import Server
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('pipeline', [False, True])
+async def test_unsupported_fields_are_learned_and_skipped(tmp_path, pipeline):
+    """Confirm get() drops unsupported fields and the map survives restarts."""
+    path = str(tmp_path / 'capabilities.json')
+    async with Server(port=0, unsupported=['pump.pressure', 'temperature.process']) as sim:
+        bath = Bath('127.0.0.1', port=sim.port, pipeline=pipeline, capabilities_file=path)
+        state = await bath.get()
+        assert 'pressure' not in state['pump']
+        assert bath.capabilities == {'pump.pressure': False}
+        commands = sim.commands
+        await bath.get()
+        assert sim.commands - commands == len(Bath.defaults) - 1
+        capabilities = await bath.probe()
+        bath.close()
+        assert capabilities['temperature.process'] is False
+        assert capabilities['temperature.bath'] is True
+
+        restarted = Bath('127.0.0.1', port=sim.port, capabilities_file=path)
+        assert restarted.capabilities == capabilities
+        with open(path) as in_file:
+            assert json.load(in_file) == {f'127.0.0.1:{sim.port}': capabilities}
+
+
+@pytest.mark.asyncio
+async def test_subscribe_skips_unsupported_fields():
+    """Confirm subscriptions leave out unsupported fields, like get()."""
+    async with Server(port=0, unsupported=['pump.pressure']) as sim, \
+            Bath('127.0.0.1', port=sim.port) as bath:
+        stream = bath.subscribe(interval=0.02)
+        for _ in range(2):
+            sample = await stream.__anext__()
+            assert 'pump.pressure' not in sample['values']
+            assert sample['values']['pump.speed'] == 0
+        await stream.aclose()
+        assert bath.capabilities == {'pump.pressure': False}
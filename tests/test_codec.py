@@ -0,0 +1,37 @@
+"""Test the precompiled codec against the reference `util` helpers."""
+import pytest
+
+from huber import codec, util
+
+
+@pytest.mark.parametrize('key', list(codec.fields))
+def test_codec_matches_util(key):
+    """Confirm compiled fields build the same commands and decode the same values."""
+    field = codec.fields[key]
+    settings = util.get_field(key)
+    assert field.command == f'{{M{settings["address"]:02X}****\r\n'.encode()
+    for digits in ['0000', '0001', '0064', 'FFFF', 'FC18']:
+        line = f'{{S{settings["address"]:02X}{digits}\r\n'.encode()
+        number = util.hex_to_int(digits)
+        if settings['format'] == 'fault' and number < 0 and number not in util.faults:
+            continue
+        assert codec.parse_reply(line, field.prefix) == number
+        assert field.decoder(number) == util.parse(number, settings)
+
+
+def test_codec_rejects_bad_replies():
+    """Confirm malformed, mismatched and unimplemented replies are handled."""
+    field = codec.fields['temperature.bath']
+    assert codec.parse_reply(b'{S000001\r\n', field.prefix) is None
+    assert codec.parse_reply(b'garbage\r\n', field.prefix) is None
+    with pytest.raises(OSError):
+        codec.parse_reply(b'{S017FFF\r\n', field.prefix)
+    assert codec.fields['temperature.setpoint'].encode(-1.5) == b'{M00FF6A\r\n'
+
+
+def test_column_values():
+    """Confirm column values are decoded numbers, unsigned status words and fault codes."""
+    assert codec.fields['temperature.bath'].to_column(2349) == 23.49
+    assert codec.fields['on'].to_column(1) is True
+    assert codec.fields['status'].to_column(-0x7fff) == 0x8001
+    assert codec.fields['error'].to_column(-3) == -3
@@ -1,12 +1,17 @@
 """Test the driver correctly initializes and returns mocked data."""
+import asyncio
 import random
 from json import loads
 from unittest import mock
 
 import pytest
 
-from huber import command_line
+from huber import command_line, connection
+from huber.driver import Bath as RealBath
+from huber.driver import BathUnavailableError
+from huber.fleet import snapshot
 from huber.mock import Bath
+from huber.simulator import Farm, Server
 
 fixed_random = random.random()
 fixed_choice = random.choice([False, True])
@@ -74,3 +79,226 @@ def test_driver_cli_setpoint(capsys, expected_data):
         captured = loads(capsys.readouterr().out)
         expected_data['temperature']['setpoint'] = 1.23
         assert expected_data == captured
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('transport', ['stream', 'protocol'])
+async def test_wire_get(transport):
+    """Confirm the real driver reads and writes over the wire protocol."""
+    async with Server(port=0, unsupported=['temperature.process']) as simulator:
+        simulator.set('status', 0b1000000000)
+        simulator.set('warning', -1)
+        async with RealBath('127.0.0.1', port=simulator.port, transport=transport) as bath:
+            state = await bath.get()
+            assert state['temperature'] == {'bath': 23.49, 'setpoint': 20.0}
+            assert state['warning']['code'] == -1
+            with pytest.raises(OSError, match='not enabled'):
+                await bath.get_process_temperature()
+            await bath.set_setpoint(-12.5)
+        assert simulator.registers[0x00] == -1250
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('transport', ['stream', 'protocol'])
+async def test_pipelined_get(simulator, transport):
+    """Confirm pipelined reads put all commands in flight at once."""
+    bath = RealBath('127.0.0.1', pipeline=True, port=simulator.port, transport=transport)
+    values = await bath._get_many(['on', 'pump.speed', 'fill'])
+    bath.close()
+    assert values == {'on': False, 'pump.speed': 0, 'fill': 0.8}
+    assert simulator.packets == 1
+    assert bath.pipeline
+
+
+@pytest.mark.asyncio
+async def test_pipelined_latency_overlaps(simulator):
+    """Confirm simulated latency is a round trip, so pipelined commands overlap."""
+    simulator.latency = 0.05
+    async with RealBath('127.0.0.1', pipeline=True, port=simulator.port) as bath:
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        values = await bath.get(flat=True)
+        assert loop.time() - start < 2 * simulator.latency
+    assert len(values) == len(RealBath.defaults)
+
+
+@pytest.mark.asyncio
+async def test_pipelined_get_fallback(simulator):
+    """Confirm dropped pipelined replies fall back to serial requests."""
+    simulator.pipelining = False
+    bath = RealBath('127.0.0.1', pipeline=True, comm_timeout=0.1, port=simulator.port)
+    values = await bath._get_many(['on', 'pump.speed', 'fill'])
+    bath.close()
+    assert values == {'on': False, 'pump.speed': 0, 'fill': 0.8}
+    assert not bath.pipeline
+
+
+@pytest.mark.asyncio
+async def test_protocol_drops_late_reply(simulator):
+    """Confirm a late reply is discarded without reconnecting."""
+    simulator.latency = 0.3
+    async with RealBath('127.0.0.1', port=simulator.port, comm_timeout=0.2,
+                        transport='protocol') as bath:
+        assert await bath.get_setpoint() is None
+        simulator.latency = 0.0
+        await bath.set_setpoint(30)  # not answered by the late read reply
+        assert await bath.get_setpoint() == 30
+        assert not any(bath.connection.pending.values())
+        assert bath.metrics.counters['bytes_received'] == 3 * 10
+        assert bath.metrics.counters['malformed'] == 0
+    assert simulator.connections == 1
+
+
+@pytest.mark.asyncio
+async def test_protocol_recovers_from_dropped_reply(simulator):
+    """Confirm a reply that never comes doesn't make later reads time out."""
+    simulator.drop_rate = 1
+    async with RealBath('127.0.0.1', port=simulator.port, comm_timeout=0.1,
+                        transport='protocol') as bath:
+        assert await bath.get_bath_temperature() is None
+        simulator.drop_rate = 0
+        readings = [await bath.get_bath_temperature() for _ in range(4)]
+        assert readings == [None, 23.49, 23.49, 23.49]  # one lost to resynchronizing
+        assert bath.metrics.counters['timeouts'] == 2
+    assert simulator.connections == 2
+
+
+@pytest.mark.asyncio
+async def test_read_cache(simulator):
+    """Confirm concurrent reads coalesce and cached fields skip the wire."""
+    ttl = {'temperature.setpoint': 60, 'temperature.bath': 0.05}
+    async with RealBath('127.0.0.1', port=simulator.port, cache_ttl=ttl) as bath:
+        temperatures = await asyncio.gather(*(bath.get_bath_temperature()
+                                              for _ in range(5)))
+        assert temperatures == [23.49] * 5
+        assert simulator.commands == 1
+        simulator.set('temperature.bath', 30)
+        assert await bath.get_bath_temperature() == 23.49
+        await asyncio.sleep(0.06)
+        assert await bath.get_bath_temperature() == 30
+        assert await bath.get_setpoint() == 20
+        await bath.set_setpoint(25)
+        assert await bath.get_setpoint() == 25
+
+
+@pytest.mark.asyncio
+async def test_subscribe_delta(simulator):
+    """Confirm delta subscriptions only emit values that moved past the deadband."""
+    async with RealBath('127.0.0.1', port=simulator.port) as bath:
+        stream = bath.subscribe(['temperature.bath', 'fill'], interval=0.02,
+                                delta=True, deadband={'temperature.bath': 0.1})
+        first = await stream.__anext__()
+        assert first['values'] == {'temperature.bath': 23.49, 'fill': 0.8}
+        simulator.set('temperature.bath', 23.55)
+        simulator.set('fill', 0.7)
+        assert (await stream.__anext__())['values'] == {'fill': 0.7}
+        simulator.set('temperature.bath', 23.6)
+        second = await stream.__anext__()
+        assert second['values'] == {'temperature.bath': 23.6}
+        assert second['time'] - first['time'] >= 0.04
+        await stream.aclose()
+
+
+@pytest.mark.asyncio
+async def test_subscribe_wildcards(simulator):
+    """Confirm subscriptions expand wildcards and parents like get()."""
+    async with RealBath('127.0.0.1', port=simulator.port) as bath:
+        stream = bath.subscribe(['pump.*', 'fill'], interval=0.02)
+        sample = await stream.__anext__()
+        assert sample['values'] == {'pump.pressure': 0.0, 'pump.speed': 0,
+                                    'pump.setpoint': 2000, 'fill': 0.8}
+        await stream.aclose()
+
+
+@pytest.mark.asyncio
+async def test_unreachable_bath_backs_off():
+    """Confirm unreachable baths fail fast until the backoff expires."""
+    async with Server(port=0) as simulator:
+        port = simulator.port
+    bath = RealBath('127.0.0.1', port=port, backoff=0.1)
+    with pytest.raises(BathUnavailableError, match='retrying in 0.1s'):
+        await bath.get_setpoint()
+    with pytest.raises(BathUnavailableError, match='next reconnect attempt'):
+        await bath.get()
+    assert bath.failures == 1
+    async with Server(port=port):
+        await asyncio.sleep(0.1)
+        assert await bath.get_setpoint() == 20
+    assert bath.failures == 0
+    bath.close()
+
+
+@pytest.mark.asyncio
+async def test_dropped_reply_reconnects(simulator):
+    """Confirm a timed-out connection is replaced instead of reused."""
+    async with RealBath('127.0.0.1', port=simulator.port, comm_timeout=0.05) as bath:
+        simulator.drop_rate = 1
+        assert await bath.get_setpoint() is None
+        simulator.drop_rate = 0
+        assert await bath.get_setpoint() == 20
+    assert simulator.connections == 2
+
+
+@pytest.mark.asyncio
+async def test_shared_connection(simulator):
+    """Confirm shared baths use one connection until the last one closes."""
+    first = RealBath('127.0.0.1', port=simulator.port, shared=True)
+    second = RealBath('127.0.0.1', port=simulator.port, shared=True)
+    await asyncio.gather(first.get_setpoint(), second.get_bath_temperature())
+    assert first.link is second.link
+    first.close()
+    assert second.open
+    assert await second.get_setpoint() == 20
+    second.close()
+    assert simulator.connections == 1
+    assert not connection.links
+    assert (first.open, first.rtt, first.failures, first.reconnecting) == (False, None, 0, False)
+    assert first.connection is None and first.timeout == first.comm_timeout
+    assert not connection.links  # reading state doesn't re-attach
+
+
+@pytest.mark.asyncio
+async def test_adaptive_timeout(simulator):
+    """Confirm timeouts track the measured round-trip time and back off."""
+    simulator.latency = 0.01
+    async with RealBath('127.0.0.1', port=simulator.port, adaptive_timeout=True,
+                        timeout_bounds=(0.02, 1.0)) as bath:
+        assert bath.rtt is None
+        assert bath.timeout == bath.comm_timeout
+        for _ in range(10):
+            await bath.get_setpoint()
+        assert 0.01 <= bath.rtt < 0.05
+        assert 0.02 <= bath.timeout < 0.2
+        simulator.drop_rate = 1
+        start = asyncio.get_running_loop().time()
+        rto = bath.link.rtt.rto
+        assert await bath.get_setpoint() is None
+        assert asyncio.get_running_loop().time() - start < 0.2
+        assert bath.link.rtt.rto == pytest.approx(2 * rto)
+
+
+@pytest.mark.asyncio
+async def test_selective_get(simulator):
+    """Confirm get(fields=...) reads only the requested addresses."""
+    async with RealBath('127.0.0.1', port=simulator.port, pipeline=True) as bath:
+        state = await bath.get(['pump.*', 'temperature.bath', 'pump.speed'])
+        assert state == {'pump': {'pressure': 0.0, 'speed': 0, 'setpoint': 2000},
+                         'temperature': {'bath': 23.49}}
+        assert simulator.commands == 4
+        assert await bath.get('temperature', flat=True) == {
+            'temperature.setpoint': 20.0, 'temperature.bath': 23.49,
+            'temperature.process': 22.71}
+        with pytest.raises(ValueError, match='Unknown field'):
+            await bath.get(['pump.flow'])
+
+
+@pytest.mark.asyncio
+async def test_snapshot_many_baths():
+    """Confirm baths on one host are read concurrently and keyed by address."""
+    async with Farm(2) as farm:
+        baths = [RealBath(host, port=int(port))
+                 for host, port in (a.split(':') for a in farm.addresses)]
+        results = await snapshot(baths, ['fill'], flat=True)
+        for bath in baths:
+            bath.close()
+    assert results == {address: {'fill': 0.8} for address in farm.addresses}
@@ -0,0 +1,50 @@
+"""Test concurrent polling of several baths."""
+import asyncio
+
+import pytest
+
+from huber import BathFleet
+from huber.scheduler import DeadlineExceededError
+from huber.simulator import Farm
+
+
+@pytest.mark.asyncio
+async def test_fleet_isolates_dead_baths():
+    """Confirm a dead bath reports None without stalling the live ones."""
+    async with Farm(2) as farm:
+        live, dead = farm.addresses
+        farm.servers[1].drop_rate = 1
+        async with BathFleet(farm.addresses, deadline=0.3) as fleet:
+            snapshots = await fleet.get()
+    assert snapshots[live]['temperature']['bath'] == 23.49
+    assert snapshots[dead] is None
+    assert fleet.last_cycle['failed'] == [dead]
+    assert fleet.last_cycle['duration'] < 1
+
+
+@pytest.mark.asyncio
+async def test_fleet_recovers_after_deadline(simulator):
+    """Confirm a bath cancelled mid-request doesn't read stale replies later."""
+    simulator.latency = 0.1
+    address = f'127.0.0.1:{simulator.port}'
+    async with BathFleet([address], deadline=0.25) as fleet:
+        assert (await fleet.get())[address] is None
+        simulator.latency = 0
+        for _ in range(3):
+            snapshot = (await fleet.get())[address]
+            assert snapshot['temperature'] == {'bath': 23.49, 'setpoint': 20.0}
+            assert snapshot['on'] is False
+
+
+@pytest.mark.asyncio
+async def test_fleet_passes_queue_deadline(simulator):
+    """Confirm the per-request queue deadline reaches each bath."""
+    simulator.latency = 0.2
+    address = f'127.0.0.1:{simulator.port}'
+    async with BathFleet([address], deadline=1, queue_deadline=0.05) as fleet:
+        bath = fleet.baths[address]
+        assert (fleet.deadline, bath.queue_deadline) == (1, 0.05)
+        first, queued = await asyncio.gather(bath.get_setpoint(), bath.get_setpoint(),
+                                             return_exceptions=True)
+    assert first == 20
+    assert isinstance(queued, DeadlineExceededError)
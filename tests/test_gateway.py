@@ -0,0 +1,60 @@
+"""Test the caching HTTP gateway."""
+import asyncio
+import json
+
+import pytest
+
+from huber.gateway import Gateway
+from huber.simulator import Farm
+
+
+async def request(port, method, path, body=b''):
+    """Send a raw HTTP request and return (status, body)."""
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(f'{method} {path} HTTP/1.1\r\nContent-Length: {len(body)}\r\n\r\n'.encode()
+                 + body)
+    response = await reader.read()
+    writer.close()
+    head, _, content = response.partition(b'\r\n\r\n')
+    return int(head.split()[1]), content
+
+
+@pytest.mark.asyncio
+async def test_gateway_serves_cache_and_forwards_writes():
+    """Confirm snapshots come from the cache and writes reach the bath."""
+    async with Farm(1) as farm, Gateway(farm.addresses, interval=0.3, port=0) as gateway:
+        ip, server = farm.addresses[0], farm.servers[0]
+        while gateway.snapshot['time'] is None:
+            await asyncio.sleep(0.01)
+        commands = server.commands
+        for _ in range(5):
+            status, content = await request(gateway.port, 'GET', '/baths')
+            assert status == 200
+        assert json.loads(content)['baths'][ip]['temperature']['bath'] == 23.49
+        assert server.commands == commands
+
+        status, _ = await request(gateway.port, 'POST', f'/baths/{ip}/set_setpoint',
+                                  b'{"value": 35.5}')
+        assert status == 200
+        assert server.registers[0x00] == 3550
+        status, _ = await request(gateway.port, 'POST', f'/baths/{ip}/set_setpoint', b'{}')
+        assert status == 400
+        for body in (b'{"value": "hot"}', b'{"value": null}', b'{"value": true}'):
+            status, content = await request(gateway.port, 'POST',
+                                            f'/baths/{ip}/set_setpoint', body)
+            assert status == 400
+            assert 'number' in json.loads(content)['error']
+        status, _ = await request(gateway.port, 'POST', f'/baths/{ip}/toggle',
+                                  b'{"value": 1}')
+        assert status == 400
+        assert server.registers[0x00] == 3550
+        status, _ = await request(gateway.port, 'GET', '/baths/10.0.0.1')
+        assert status == 404
+
+        reader, writer = await asyncio.open_connection('127.0.0.1', gateway.port)
+        writer.write(b'GET /stream HTTP/1.1\r\n\r\n')
+        await reader.readuntil(b'\r\n\r\n')
+        lines = [json.loads(await reader.readline()) for _ in range(3)]
+        writer.close()
+        assert lines[-1]['baths'][ip]['temperature']['setpoint'] == 35.5
+        assert lines[2]['time'] > lines[1]['time']
@@ -0,0 +1,29 @@
+"""Test request metrics and their Prometheus rendering."""
+import pytest
+
+from huber import Bath
+from huber.simulator import Server
+
+
+@pytest.mark.asyncio
+async def test_request_metrics():
+    """Confirm requests are counted, timed, traced and rendered."""
+    traces = []
+    async with Server(port=0, unsupported=['temperature.process']) as simulator:
+        bath = Bath('127.0.0.1', port=simulator.port, trace=traces.append)
+        await bath.get()
+        with pytest.raises(OSError):
+            await bath.get_process_temperature()
+        bath.close()
+    snapshot = bath.metrics.snapshot()
+    assert snapshot['requests'] == len(Bath.defaults) + 1
+    assert snapshot['not_implemented'] == 1
+    assert snapshot['bytes_sent'] == snapshot['bytes_received'] == 10 * snapshot['requests']
+    assert snapshot['latency']['temperature.bath']['count'] == 1
+    assert snapshot['wire']['buckets'][float('inf')] == snapshot['requests']
+    assert [t['key'] for t in traces][-1] == 'temperature.process'
+
+    text = bath.metrics.prometheus({'ip': bath.ip})
+    assert 'huber_requests_total{ip="127.0.0.1"} 10\n' in text
+    assert 'huber_request_seconds_count{ip="127.0.0.1",field="fill"} 1\n' in text
+    assert 'huber_wire_seconds_bucket{ip="127.0.0.1",le="+Inf"} 10\n' in text
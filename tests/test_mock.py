@@ -0,0 +1,83 @@
+"""Test the simulated bath model."""
+import asyncio
+
+import pytest
+
+from huber.mock import SimulatedBath, Thermostat, VirtualClock
+
+
+@pytest.mark.asyncio
+async def test_thermal_response():
+    """Confirm the bath settles toward its setpoint with first-order dynamics."""
+    clock = VirtualClock(speed=0)
+    bath = SimulatedBath(model=Thermostat(clock, seed=1, noise=0))
+    await bath.set_setpoint(60)
+    await bath.start()
+    await clock.sleep(300)
+    assert await bath.get_bath_temperature() == pytest.approx(22 + 38 * (1 - 1 / 2.718), abs=0.05)
+    await clock.sleep(3000)
+    state = await bath.get()
+    assert state['temperature']['bath'] == pytest.approx(60, abs=0.01)
+    assert state['pump']['speed'] == 2000
+    assert state['status']['circulating']
+
+
+@pytest.mark.asyncio
+async def test_seeded_runs_repeat():
+    """Confirm the same seed gives the same readings."""
+    async def run(seed):
+        clock = VirtualClock(speed=0)
+        bath = SimulatedBath(model=Thermostat(clock, seed=seed, fault_rate=10))
+        await bath.start()
+        readings = []
+        for _ in range(20):
+            await clock.sleep(60)
+            readings.append(await bath.get(['temperature', 'warning'], flat=True))
+        return readings
+
+    assert await run(3) == await run(3)
+    assert await run(3) != await run(4)
+
+
+@pytest.mark.asyncio
+async def test_fault_injection():
+    """Confirm injected errors stop the bath until cleared."""
+    clock = VirtualClock(speed=0)
+    model = Thermostat(clock)
+    bath = SimulatedBath(model=model)
+    await bath.start()
+    model.inject(-1)
+    state = await bath.get()
+    assert state['error']['type'] == 'hard error'
+    assert not state['on']
+    await bath.clear_error()
+    await bath.start()
+    assert (await bath.get())['on']
+    with pytest.raises(ValueError):
+        model.inject(12345)
+
+
+@pytest.mark.asyncio
+async def test_accelerated_clock():
+    """Confirm simulated time runs faster than real time."""
+    clock = VirtualClock(speed=1000)
+    await clock.sleep(5)
+    assert 5 <= clock.time() < 50
+
+
+@pytest.mark.asyncio
+async def test_concurrent_sleepers_share_time():
+    """Confirm concurrent sleepers on a stopped clock wake in simulated order."""
+    clock = VirtualClock(speed=0)
+    woken = []
+
+    async def sleeper(name, seconds, repeats):
+        for _ in range(repeats):
+            await clock.sleep(seconds)
+            woken.append((clock.time(), name))
+
+    await asyncio.gather(*(sleeper(i, 10, 3) for i in range(5)), sleeper('slow', 25, 1))
+    assert clock.time() == 30
+    assert [t for t, _ in woken] == sorted(t for t, _ in woken)
+    assert (25, 'slow') in woken
+    assert sum(t == 30 for t, _ in woken) == 5
@@ -0,0 +1,54 @@
+"""Test setpoint profiles."""
+import pytest
+
+from huber.driver import Bath
+from huber.mock import SimulatedBath, Thermostat, VirtualClock
+from huber.profile import Point, Profile, ProfileRunner
+
+
+def test_profile_interpolation():
+    """Confirm channels ramp linearly between the points that set them."""
+    profile = Profile([Point(0, 20), Point(100, 40, 2000), Point(200, pump_speed=3000)])
+    assert profile.at(0) == {'temperature.setpoint': 20}
+    assert profile.at(50) == {'temperature.setpoint': 30}
+    assert profile.at(150) == {'temperature.setpoint': 40, 'pump.setpoint': 2500}
+    assert profile.at(500) == {'temperature.setpoint': 40, 'pump.setpoint': 3000}
+    assert profile.duration == 200
+
+
+def test_profile_rejects_out_of_range_points():
+    """Confirm points are checked against field ranges before any write."""
+    with pytest.raises(ValueError, match='setpoint 400 at 60s'):
+        Profile([Point(0, 20), Point(60, 400)])
+    with pytest.raises(ValueError, match='pump_speed 100 at 0s'):
+        ProfileRunner({Bath('10.0.0.1'): [Point(0, 20, 100)]})
+
+
+@pytest.mark.asyncio
+async def test_multi_bath_profile():
+    """Confirm baths follow their profiles on a shared virtual schedule."""
+    clock = VirtualClock(speed=0)
+    models = [Thermostat(clock, seed=i) for i in range(2)]
+    baths = [SimulatedBath(f'bath{i}', model=model) for i, model in enumerate(models)]
+    runner = ProfileRunner({baths[0]: [Point(0, 20), Point(600, 80, 3000)],
+                            baths[1]: [Point(0, 30), Point(300, 30)]}, tick=60, clock=clock)
+    report = await runner.run()
+    summary = report.summary()
+    assert summary['ticks'] == 11
+    assert summary['jitter']['max'] == 0
+    assert summary['failures'] == 0
+    assert len([w for w in report.writes if w.ip == 'bath1']) == 1
+    assert models[0].setpoint == 80 and models[0].pump_setpoint == 3000
+    assert clock.time() == 600
+
+
+@pytest.mark.asyncio
+async def test_pipelined_profile_writes(simulator):
+    """Confirm each tick's writes to a bath share one packet."""
+    async with Bath('127.0.0.1', port=simulator.port, pipeline=True) as bath:
+        report = await ProfileRunner({bath: [Point(0, 20, 2000), Point(0.1, 21, 2500)]},
+                                     tick=0.05).run()
+    assert report.summary()['failures'] == 0
+    assert simulator.packets == len(report.ticks) - report.skipped
+    assert simulator.registers[0x00] == 2100
+    assert simulator.registers[0x48] == 2500
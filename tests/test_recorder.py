@@ -0,0 +1,51 @@
+"""Test the ring-buffer history recorder."""
+import io
+
+import pytest
+
+from huber import Bath, codec
+from huber.recorder import Recorder
+
+
+def test_ring_buffer_wraps_and_downsamples():
+    """Confirm old samples are overwritten and windows reduce correctly."""
+    recorder = Recorder(capacity=4, fields=['temperature.bath', 'status'])
+    field = codec.fields['temperature.bath']
+    for t in range(6):
+        recorder.record(field, 2000 + 100 * t, timestamp=float(t))
+    times, values = recorder.get('temperature.bath')
+    assert list(times) == [2.0, 3.0, 4.0, 5.0]
+    assert list(values) == [22.0, 23.0, 24.0, 25.0]
+    assert values.typecode == 'd'
+    assert list(recorder.get('temperature.bath', start=3, end=4)[1]) == [23.0, 24.0]
+    windows = recorder.downsample('temperature.bath', window=2)
+    assert list(windows['time']) == [2.0, 4.0]
+    assert list(windows['min']) == [22.0, 24.0]
+    assert list(windows['mean']) == [22.5, 24.5]
+    out = io.StringIO()
+    recorder.to_csv('temperature.bath', out, start=5)
+    assert out.getvalue().splitlines() == ['time,temperature.bath', '5.0,25.0']
+
+
+@pytest.mark.asyncio
+async def test_bath_feeds_recorder(simulator):
+    """Confirm readings from the driver land in the recorder."""
+    recorder = Recorder(capacity=10)
+    async with Bath('127.0.0.1', port=simulator.port, recorder=recorder) as bath:
+        await bath.get()
+        await bath.get()
+    assert list(recorder.get('fill')[1]) == [0.8, 0.8]
+    assert list(recorder.get('status')[1]) == [0, 0]
+    assert len(recorder.get('temperature.process')[0]) == 0
+
+
+@pytest.mark.asyncio
+async def test_recorder_never_fails_reads(simulator):
+    """Confirm a status with bit 15 set is recorded and a failing hook is ignored."""
+    simulator.registers[0x0a] = -0x7fff  # 0x8001
+    recorder = Recorder(fields=['status'])
+    async with Bath('127.0.0.1', port=simulator.port, recorder=recorder) as bath:
+        assert (await bath.get_status())['controlling']
+        assert list(recorder.get('status')[1]) == [0x8001]
+        recorder.columns = None  # breaks record()
+        assert (await bath.get_status())['controlling']
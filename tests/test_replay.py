@@ -0,0 +1,63 @@
+"""Test recording and replaying wire traffic."""
+import pytest
+
+from huber.driver import Bath
+from huber.replay import Exchange, ReplayBath, WireLog, read, replay
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('transport', ['stream', 'protocol'])
+async def test_record_and_replay(simulator, tmp_path, transport):
+    """Confirm recorded traffic replays through the driver."""
+    path = str(tmp_path / 'traffic.log')
+    simulator.set('status', 0b1000000000)
+    simulator.set('warning', -1)
+    with WireLog(path) as log:
+        async with Bath('127.0.0.1', port=simulator.port, trace=log,
+                        transport=transport) as bath:
+            recorded = await bath.get()
+            await bath.set_setpoint(30)
+            bath.pipeline = True
+            pipelined = await bath.get(['temperature', 'pump'], flat=True)
+    exchanges = list(read(path))
+    assert exchanges[0].commands == ('{M14****',)
+    assert any(len(e.commands) > 1 for e in exchanges)
+
+    bath = ReplayBath(path, ip='127.0.0.1', speed=None)
+    assert await bath.get() == recorded
+    await bath.set_setpoint(30)
+    bath.pipeline = True
+    assert await bath.get(['temperature', 'pump'], flat=True) == pipelined
+    assert await bath.get_setpoint() is None  # nothing left to replay
+
+    baths = await replay(path, speed=None)
+    assert baths['127.0.0.1'].metrics.counters['requests'] == sum(
+        len(e.commands) for e in exchanges)
+    assert baths['127.0.0.1'].metrics.counters['timeouts'] == 0
+
+
+@pytest.mark.asyncio
+async def test_replay_dropped_pipelined_reply():
+    """Confirm a recorded missing reply falls back to serial reads."""
+    bath = ReplayBath([Exchange(0.0, 0.001, 'replay', ('{M01****', '{M00****'),
+                                ('{S010929',))], speed=None)
+    bath.pipeline = True
+    values = await bath.get(['temperature.bath', 'temperature.setpoint'], flat=True)
+    assert values == {'temperature.bath': 23.45, 'temperature.setpoint': None}
+    assert not bath.pipeline
+
+
+@pytest.mark.asyncio
+async def test_replay_pipelined_writes(simulator, tmp_path):
+    """Confirm recorded set_many batches replay as writes, not reads."""
+    path = str(tmp_path / 'traffic.log')
+    with WireLog(path) as log:
+        async with Bath('127.0.0.1', port=simulator.port, trace=log,
+                        pipeline=True) as bath:
+            await bath.set_many({'temperature.setpoint': 30, 'pump.setpoint': 3000})
+    assert read(path).__next__().commands == ('{M000BB8', '{M480BB8')
+
+    baths = await replay(path, speed=None)
+    counters = baths['127.0.0.1'].metrics.counters
+    assert counters['requests'] == 2
+    assert counters['timeouts'] == counters['reconnects'] == 0
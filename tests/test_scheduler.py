@@ -0,0 +1,47 @@
+"""Test priority scheduling of bath requests."""
+import asyncio
+
+import pytest
+
+from huber import Bath
+from huber.scheduler import ALARM, CONTROL, TELEMETRY, DeadlineExceededError, Scheduler
+
+
+@pytest.mark.asyncio
+async def test_priority_order_and_stale_requests():
+    """Confirm control jumps the queue and abandoned requests are skipped."""
+    scheduler = Scheduler()
+    order = []
+
+    async def request(name, priority, deadline=None):
+        async with scheduler.request(priority, deadline):
+            order.append(name)
+            await asyncio.sleep(0)
+
+    await scheduler.acquire()
+    tasks = [asyncio.ensure_future(request(f't{i}', TELEMETRY)) for i in range(3)]
+    tasks.append(asyncio.ensure_future(request('alarm', ALARM)))
+    tasks.append(asyncio.ensure_future(request('stop', CONTROL)))
+    late = asyncio.ensure_future(request('late', TELEMETRY, deadline=0.01))
+    await asyncio.sleep(0.02)
+    tasks[1].cancel()
+    scheduler.release()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    with pytest.raises(DeadlineExceededError):
+        await late
+    assert order == ['stop', 'alarm', 't0', 't2']
+    assert not scheduler.locked()
+
+
+@pytest.mark.asyncio
+async def test_writes_preempt_polling(simulator):
+    """Confirm a setpoint write is sent ahead of queued telemetry."""
+    simulator.latency = 0.01
+    keys = []
+    async with Bath('127.0.0.1', port=simulator.port,
+                    trace=lambda t: keys.append(t['key'])) as bath:
+        reads = [asyncio.ensure_future(bath.get_bath_temperature()) for _ in range(5)]
+        await asyncio.sleep(0)
+        await bath.set_setpoint(30)
+        await asyncio.gather(*reads)
+    assert keys.index('temperature.setpoint') == 1
@@ -0,0 +1,53 @@
+"""Test sharded polling into shared memory."""
+import asyncio
+import time
+
+import pytest
+
+from huber import codec
+from huber.shard import ShardedPoller, Table
+from huber.simulator import Farm
+
+
+def test_table_round_trip():
+    """Confirm rows written in one table are read whole from another."""
+    table = Table(['a', 'b'])
+    try:
+        other = Table(['a', 'b'], table.name)
+        table.write(1, {codec.fields['temperature.bath']: 2349,
+                        codec.fields['on']: 1,
+                        codec.fields['status']: 0b10011,
+                        codec.fields['warning']: -1}, timestamp=5.0)
+        assert other['a'] is None
+        row = other['b']
+        assert row['time'] == 5.0
+        assert row['values']['temperature.bath'] == 23.49
+        assert row['values']['on'] is True
+        assert row['values']['status']['pumping']
+        assert row['values']['warning']['code'] == -1
+        speeds = other.column('temperature.bath')
+        other.close()
+        assert list(speeds) == [0.0, 23.49]
+        table.columns['seq'][0] = 1  # left mid-write by a killed worker
+        assert table.read(0) is None
+    finally:
+        table.close()
+        table.unlink()
+
+
+@pytest.mark.asyncio
+async def test_sharded_poller():
+    """Confirm worker processes fill the table for every bath."""
+    async with Farm(4) as farm:
+        farm.servers[2].set('temperature.setpoint', 42)
+        with ShardedPoller(farm.addresses, processes=2, interval=0.1) as poller:
+            deadline = time.monotonic() + 20
+            while time.monotonic() < deadline:
+                snapshot = poller.get()
+                if all(snapshot.values()):
+                    break
+                await asyncio.sleep(0.05)
+            speeds = poller.table.column('pump.speed')
+        assert list(speeds) == [0] * 4
+        assert [row['values']['temperature.setpoint'] for row in snapshot.values()] == [
+            20, 20, 42, 20]
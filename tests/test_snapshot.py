@@ -0,0 +1,35 @@
+"""Test typed snapshots."""
+import pytest
+
+from huber.driver import Bath
+from huber.snapshot import Snapshot, Status
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('pipeline', [False, True])
+async def test_snapshot_matches_get(simulator, pipeline):
+    """Confirm snapshots convert to the same structure as `get()`."""
+    simulator.set('status', 0b1000010001)
+    simulator.set('warning', -1)
+    async with Bath('127.0.0.1', port=simulator.port, pipeline=pipeline) as bath:
+        snapshot = await bath.get_snapshot()
+        assert snapshot.to_dict() == await bath.get()
+        assert snapshot.to_dict(flat=True) == await bath.get(flat=True)
+        assert snapshot.temperature_bath == 23.49
+        assert snapshot.status.pumping and not snapshot.status.error
+        assert snapshot.warning == -1
+        partial = await bath.get_snapshot(['pump'])
+        assert partial.to_dict() == await bath.get(['pump'])
+        assert partial.temperature_bath is None
+
+
+def test_snapshot_record():
+    """Confirm snapshots are fixed-layout records."""
+    snapshot = Snapshot.from_raw({'on': 1, 'status': 0b10011, 'fill': 800}, time=1.0)
+    assert snapshot == Snapshot(1.0, on=True, status=Status(0b10011), fill=0.8)
+    assert snapshot.to_dict()['status']['circulating']
+    assert not hasattr(snapshot, '__dict__')
+    with pytest.raises(AttributeError):
+        snapshot.extra = 1
+    with pytest.raises(TypeError):
+        Snapshot(temperature=1)
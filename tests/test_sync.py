@@ -0,0 +1,48 @@
+"""Test the synchronous facade."""
+import concurrent.futures
+
+import pytest
+
+from huber.simulator import Server
+from huber.sync import SyncBath, SyncFleet, run
+
+
+@pytest.fixture
+def simulator():
+    """Run a simulated bath on the background loop."""
+    server = Server(port=0)
+    run(server.start())
+    yield server
+    run(server.stop())
+
+
+def test_threads_share_connection(simulator):
+    """Confirm calls from many threads reuse one connection."""
+    with SyncBath('127.0.0.1', port=simulator.port) as bath:
+        bath.set_setpoint(30)
+        with concurrent.futures.ThreadPoolExecutor(8) as pool:
+            setpoints = list(pool.map(lambda _: bath.get_setpoint(), range(32)))
+        assert setpoints == [30] * 32
+        assert simulator.connections == 1
+
+
+def test_timeout(simulator):
+    """Confirm slow calls raise after the timeout."""
+    simulator.latency = 0.5
+    bath = SyncBath('127.0.0.1', port=simulator.port)
+    with pytest.raises(concurrent.futures.TimeoutError):
+        bath.get_setpoint(timeout=0.1)
+    simulator.latency = 0
+    assert [bath.get_setpoint() for _ in range(3)] == [20] * 3
+    bath.close()
+
+
+def test_fleet_and_subscribe(simulator):
+    """Confirm fleets and subscriptions work through the facade."""
+    with SyncFleet([f'127.0.0.1:{simulator.port}']) as fleet:
+        state = fleet.get(['temperature.setpoint'], flat=True)
+        assert state == {f'127.0.0.1:{simulator.port}': {'temperature.setpoint': 20.0}}
+    with SyncBath('127.0.0.1', port=simulator.port) as bath:
+        samples = bath.subscribe(['on'], interval=0.01)
+        assert [next(samples)['values'] for _ in range(2)] == [{'on': False}] * 2
+        samples.close()
@@ -0,0 +1,37 @@
+"""Test the encoding utilities and their import-time cost."""
+import asyncio
+import subprocess
+import sys
+
+from huber import util
+
+
+def test_import_reads_no_files():
+    """Confirm importing huber leaves the fault table unloaded."""
+    probe = ('import sys, huber, huber.util as u; '
+             'print(u._faults is None, "csv" in sys.modules)')
+    output = subprocess.run([sys.executable, '-c', probe], check=True,
+                            capture_output=True, text=True).stdout
+    assert output.split() == ['True', 'False']
+
+
+def test_faults_load_on_first_use():
+    """Confirm the lazily loaded fault table decodes fault codes."""
+    assert util.faults[-1]['type'] == 'hard error'
+    assert util.parse(-1, util.get_field('error')) is util.faults[-1]
+    assert util.parse(0, util.get_field('error')) is None
+
+
+def test_next_tick_skips_missed_ticks():
+    """Confirm ticks stay on the grid and late cycles skip ahead."""
+    assert util.next_tick(0, 100.0, 1.0, 100.4) == 1
+    assert util.next_tick(1, 100.0, 1.0, 103.5) == 4
+    assert util.next_tick(4, 100.0, 0.5, 101.0) == 5
+
+
+def test_offer_drops_oldest():
+    """Confirm a full queue loses its oldest item instead of blocking."""
+    queue: asyncio.Queue = asyncio.Queue(2)
+    for item in range(3):
+        util.offer(queue, item)
+    assert [queue.get_nowait(), queue.get_nowait()] == [1, 2]